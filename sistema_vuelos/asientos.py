@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+INVENTARIO DE ASIENTOS
+"""
+
+import atexit
+import os
+import threading
+
+import psycopg2.extras
+
+LETRAS = 'ABCDEF'
+
+# Filas de cada cabina en proporción al total de filas del avión
+PROPORCION_CLASES = (('primera', 0.05), ('ejecutiva', 0.15))
+
+
+class SinAsientos(Exception):
+    """No queda un asiento libre que cumpla lo pedido"""
+
+
+def distribucion_asientos(capacidad):
+    """Asientos de un vuelo derivados de su capacidad: [(asiento, clase, fila)].
+
+    Filas de 6 asientos (A-F); las primeras filas son de primera clase, las
+    siguientes de ejecutiva y el resto de económica. La última fila puede
+    quedar incompleta.
+    """
+    filas = -(-capacidad // len(LETRAS))
+    limites = []
+    acumulado = 0
+    for clase, proporcion in PROPORCION_CLASES:
+        acumulado += round(filas * proporcion)
+        limites.append((acumulado, clase))
+    asientos = []
+    for n in range(capacidad):
+        fila = n // len(LETRAS) + 1
+        clase = next((c for limite, c in limites if fila <= limite), 'economica')
+        asientos.append((f'{fila}{LETRAS[n % len(LETRAS)]}', clase, fila))
+    return asientos
+
+
+def crear_asientos(cur, vuelo_id, capacidad):
+    """Da de alta los asientos de un vuelo nuevo"""
+    psycopg2.extras.execute_values(
+        cur, 'INSERT INTO asientos (vuelo_id, asiento, clase, fila) VALUES %s',
+        [(vuelo_id, asiento, clase, fila) for asiento, clase, fila in distribucion_asientos(capacidad)],
+        page_size=1000)
+
+
+def ajustar_asientos(cur, vuelo_id, capacidad):
+    """Adapta los asientos de un vuelo a una capacidad nueva.
+
+    Se añaden los que faltan, se reclasifican los libres y se borran los
+    libres que sobran. Si sobra alguno ocupado se lanza SinAsientos.
+    """
+    distribucion = distribucion_asientos(capacidad)
+    psycopg2.extras.execute_values(cur, '''
+        INSERT INTO asientos (vuelo_id, asiento, clase, fila) VALUES %s
+        ON CONFLICT (vuelo_id, asiento) DO UPDATE SET clase = EXCLUDED.clase
+        WHERE asientos.reserva_id IS NULL
+    ''', [(vuelo_id, asiento, clase, fila) for asiento, clase, fila in distribucion], page_size=1000)
+    validos = [asiento for asiento, _, _ in distribucion]
+    cur.execute('''
+        SELECT asiento FROM asientos
+        WHERE vuelo_id = %s AND reserva_id IS NOT NULL AND NOT (asiento = ANY(%s))
+        LIMIT 1
+    ''', (vuelo_id, validos))
+    ocupado = cur.fetchone()
+    if ocupado:
+        raise SinAsientos(f'El asiento {ocupado[0]} está reservado y no cabe en la nueva capacidad')
+    cur.execute('DELETE FROM asientos WHERE vuelo_id = %s AND NOT (asiento = ANY(%s))', (vuelo_id, validos))
+
+
+def tomar_asiento(cur, vuelo_id, clase=None, asiento=None):
+    """Bloquea un asiento libre dentro de la transacción en curso y lo devuelve.
+
+    Con SKIP LOCKED los asientos que otra reserva está tomando en ese momento
+    se saltan en vez de esperar, así varias reservas del mismo vuelo avanzan
+    a la vez. Con `asiento` se pide ese en concreto; si no, el primero libre
+    de la clase (por fila y letra).
+    """
+    condiciones = ['vuelo_id = %s', 'reserva_id IS NULL']
+    params = [vuelo_id]
+    if asiento:
+        condiciones.append('asiento = %s')
+        params.append(asiento.strip().upper())
+    if clase:
+        condiciones.append('clase = %s')
+        params.append(clase)
+    cur.execute(f'''
+        SELECT asiento FROM asientos
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY fila, asiento
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ''', params)
+    fila = cur.fetchone()
+    if fila is None:
+        if asiento:
+            raise SinAsientos(f'El asiento {asiento} no está libre en esa clase')
+        raise SinAsientos('No quedan asientos libres en esa clase')
+    return fila[0]
+
+
+def ocupar_asiento(cur, vuelo_id, asiento, reserva_id):
+    """Asigna a la reserva el asiento tomado con tomar_asiento()"""
+    cur.execute('UPDATE asientos SET reserva_id = %s WHERE vuelo_id = %s AND asiento = %s',
+                (reserva_id, vuelo_id, asiento))
+
+
+def liberar_asiento(cur, reserva_id):
+    """Deja libre el asiento de una reserva; devuelve (vuelo_id, asiento) o None"""
+    cur.execute('UPDATE asientos SET reserva_id = NULL WHERE reserva_id = %s RETURNING vuelo_id, asiento', (reserva_id,))
+    fila = cur.fetchone()
+    return (fila[0], fila[1]) if fila else None
+
+
+SQL_RECONTAR = '''
+    UPDATE vuelos v SET asientos_disponibles = c.libres
+    FROM (
+        SELECT vuelo_id, COUNT(*) FILTER (WHERE reserva_id IS NULL) AS libres
+        FROM asientos WHERE vuelo_id = ANY(%s)
+        GROUP BY vuelo_id
+    ) c
+    WHERE v.id = c.vuelo_id AND v.asientos_disponibles IS DISTINCT FROM c.libres
+'''
+
+
+def recontar_disponibles(cur, vuelo_ids):
+    """Recalcula vuelos.asientos_disponibles a partir de los asientos libres"""
+    cur.execute(SQL_RECONTAR, (list(vuelo_ids),))
+
+
+class ContadorAsientos:
+    """Mantiene `vuelos.asientos_disponibles` al día fuera de las reservas.
+
+    Las reservas no actualizan la fila del vuelo (todas harían cola sobre ella):
+    anotan el vuelo con `marcar()` y un hilo recuenta, cada `intervalo`
+    segundos, todos los vuelos anotados en una sola sentencia. Como se
+    recuenta desde la tabla de asientos, un recuento perdido o desordenado se
+    corrige en el siguiente.
+    """
+
+    def __init__(self, pool, intervalo=1.0):
+        self._pool = pool
+        self.intervalo = intervalo
+        self._iniciar_estado()
+        self._stats = {'recuentos': 0, 'vuelos': 0, 'fallidos': 0}
+        atexit.register(self.detener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        self._pendientes = set()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._parar = threading.Event()
+
+    def marcar(self, vuelo_id):
+        self._asegurar_hilo()
+        with self._lock:
+            self._pendientes.add(vuelo_id)
+
+    def _asegurar_hilo(self):
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._bucle, name='contador-asientos', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.vaciar()
+        self.vaciar()
+
+    def vaciar(self):
+        """Recuenta ya los vuelos pendientes"""
+        with self._lock:
+            vuelos, self._pendientes = self._pendientes, set()
+        if not vuelos:
+            return
+        conn = None
+        try:
+            conn = self._pool.obtener()
+            cur = conn.cursor()
+            recontar_disponibles(cur, vuelos)
+            conn.commit()
+            cur.close()
+            with self._lock:
+                self._stats['recuentos'] += 1
+                self._stats['vuelos'] += len(vuelos)
+        except Exception as e:
+            with self._lock:
+                self._stats['fallidos'] += 1
+                self._pendientes |= vuelos
+            print(f"Error al recontar asientos: {e}")
+        finally:
+            if conn is not None:
+                self._pool.devolver(conn)
+
+    def detener(self, timeout=5.0):
+        self._parar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo.is_alive() and self._pid == os.getpid():
+            hilo.join(timeout)
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['pendientes'] = len(self._pendientes)
+        return datos
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+ESCRITURA DIFERIDA DE LOGS DE AUDITORÍA
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import psycopg2.errors
+import psycopg2.extras
+
+INSERT_LOGS = '''
+    INSERT INTO logs_auditoria (usuario_id, accion, tabla_afectada, registro_id, detalles, ip_address, fecha_hora)
+    VALUES %s
+'''
+
+
+class EscritorAuditoria:
+    """Encola registros de auditoría y un hilo los inserta por lotes.
+
+    Se vacía la cola cuando hay `tam_lote` registros o han pasado `intervalo`
+    segundos. Con la cola llena (`maximo`), la política 'descartar' tira el
+    registro nuevo y 'esperar' bloquea hasta `espera` segundos antes de
+    tirarlo.
+    """
+
+    def __init__(self, pool, tam_lote=200, intervalo=1.0, maximo=10000,
+                 politica='descartar', espera=0.05):
+        self._pool = pool
+        self.tam_lote = tam_lote
+        self.intervalo = intervalo
+        self.politica = politica
+        self.espera = espera
+        self.maximo = maximo
+        self._iniciar_estado()
+        self._stats = {'encolados': 0, 'escritos': 0, 'descartados': 0, 'fallidos': 0, 'lotes': 0, 'particiones': 0}
+        atexit.register(self.detener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        # En un hijo recién creado los registros pendientes son del padre:
+        # se empieza con cola y cerrojo nuevos para no escribirlos dos veces
+        self._cola = queue.Queue(maxsize=self.maximo)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._parar = threading.Event()
+
+    def registrar(self, usuario_id, accion, tabla, registro_id, detalles_json, ip, fecha_hora):
+        """Encola un registro; nunca lanza excepción ni toca la base de datos"""
+        self._asegurar_hilo()
+        fila = (usuario_id, accion, tabla, registro_id, detalles_json, ip, fecha_hora)
+        try:
+            if self.politica == 'esperar':
+                self._cola.put(fila, timeout=self.espera)
+            else:
+                self._cola.put_nowait(fila)
+        except queue.Full:
+            self._contar('descartados')
+            return False
+        self._contar('encolados')
+        return True
+
+    def _asegurar_hilo(self):
+        # El hilo no sobrevive a un fork: cada worker arranca el suyo
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._bucle, name='escritor-auditoria', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            lote = self._recoger(self.intervalo)
+            if lote:
+                self._escribir(lote)
+        self.vaciar()
+
+    def _recoger(self, intervalo):
+        lote = []
+        limite = time.monotonic() + intervalo
+        while len(lote) < self.tam_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote):
+        conn = None
+        try:
+            conn = self._pool.obtener()
+            try:
+                self._insertar(conn, lote)
+            except psycopg2.errors.CheckViolation:
+                # Alguna fila cae en un mes sin partición: se crean y se repite
+                conn.rollback()
+                self._crear_particiones(conn, lote)
+                self._insertar(conn, lote)
+            self._contar('escritos', len(lote))
+            self._contar('lotes')
+        except Exception as e:
+            self._contar('fallidos', len(lote))
+            print(f"Error en log: {e}")
+        finally:
+            if conn is not None:
+                self._pool.devolver(conn)
+
+    def _insertar(self, conn, lote):
+        cur = conn.cursor()
+        psycopg2.extras.execute_values(cur, INSERT_LOGS, lote, page_size=len(lote))
+        conn.commit()
+        cur.close()
+
+    def _crear_particiones(self, conn, lote):
+        fechas = [fila[6] for fila in lote if fila[6] is not None] or [datetime.now()]
+        cur = conn.cursor()
+        cur.execute('SELECT crear_particiones_logs(%s::date, %s::date)', (min(fechas), max(fechas)))
+        self._contar('particiones', cur.fetchone()[0])
+        conn.commit()
+        cur.close()
+
+    def vaciar(self):
+        """Escribe todo lo pendiente en la cola"""
+        while True:
+            lote = []
+            try:
+                while len(lote) < self.tam_lote:
+                    lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                pass
+            if not lote:
+                return
+            self._escribir(lote)
+
+    def detener(self, timeout=5.0):
+        """Para el hilo vaciando antes la cola (se llama al salir del proceso)"""
+        self._parar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo.is_alive() and self._pid == os.getpid():
+            hilo.join(timeout)
+        else:
+            self.vaciar()
+
+    def _contar(self, clave, n=1):
+        with self._lock:
+            self._stats[clave] += n
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos['en_cola'] = self._cola.qsize()
+        return datos
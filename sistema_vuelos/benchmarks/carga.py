@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+BENCHMARK: PRUEBA DE CARGA DE EXTREMO A EXTREMO
+
+Uso (desde sistema_vuelos/, con PostgreSQL local y las migraciones aplicadas):
+    python benchmarks/carga.py --escalas 10000 100000 [--clientes 16] [--duracion 60]
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --sin-sembrar
+    python benchmarks/carga.py --comparar resultados/antes.json resultados/despues.json
+
+Para cada escala (número de reservas) vacía la base y la llena con
+datos_sinteticos.py con una semilla fija, arranca la app con gunicorn (los
+argumentos del startCommand de render.yaml, salvo --workers/--threads) y la
+ataca con `--clientes` clientes concurrentes durante `--duracion` segundos.
+Cada cliente inicia sesión y repite una mezcla de operaciones (dashboard,
+listados, búsqueda, reservar, cancelar, volver a iniciar sesión...) sin
+pausas. Las ids de vuelos, pasajeros y reservas a cancelar se toman de la
+base antes de empezar.
+
+Por ruta se guardan peticiones/s, errores y percentiles de latencia en un
+JSON en benchmarks/resultados/ junto con el commit. `--comparar` enfrenta
+dos resultados y termina con código 1 si alguna ruta empeora más de
+`--tolerancia` por ciento, para usarlo en CI.
+
+La ruta /reservas lista todas las reservas sin paginar; tiene peso 0 en la
+mezcla por defecto (--mezcla reservas=1 para incluirla).
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime
+
+DIRECTORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO_APP)
+
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO_APP, 'benchmarks', 'resultados')
+RENDER_YAML = os.path.join(DIRECTORIO_APP, 'render.yaml')
+
+# Operación: peso en la mezcla por defecto
+MEZCLA = {
+    'dashboard': 15,
+    'vuelos': 15,
+    'buscar': 10,
+    'pasajeros': 10,
+    'sugerencias': 10,
+    'api_vuelos': 10,
+    'pasajeros_vuelo': 5,
+    'form_reserva': 5,
+    'reservar': 10,
+    'cancelar': 5,
+    'login': 5,
+    'reservas': 0,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, min(len(ordenados) - 1, -(-p * len(ordenados) // 100) - 1))]
+
+
+def commit_actual():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO_APP,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=DIRECTORIO_APP,
+                                 capture_output=True, text=True).stdout.strip()
+        return commit + ('-modificado' if cambios else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def argumentos_produccion():
+    """Argumentos de gunicorn tras `app:app` en el startCommand de render.yaml"""
+    with open(RENDER_YAML, encoding='utf-8') as f:
+        for linea in f:
+            clave, _, valor = linea.strip().partition(':')
+            if clave == 'startCommand':
+                comando = shlex.split(valor.split('&&')[-1])
+                return comando[comando.index('app:app') + 1:]
+    raise RuntimeError(f'{RENDER_YAML} no tiene startCommand')
+
+
+# ==================== PREPARACIÓN ====================
+
+def sembrar(reservas, semilla, hoy):
+    subprocess.run([sys.executable, 'datos_sinteticos.py', '--reservas', str(reservas), '--semilla', str(semilla),
+                    '--hoy', hoy.isoformat(), '--vaciar'], cwd=DIRECTORIO_APP, check=True)
+
+
+def datos_de_prueba(muestra=5000):
+    """Ids y textos reales para que las peticiones encuentren algo"""
+    from conexiones import crear_conexion
+
+    conn = crear_conexion()
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            SELECT id, origen, destino FROM vuelos
+            WHERE estado = 'programado' AND fecha_salida > LOCALTIMESTAMP AND asientos_disponibles > 0
+            ORDER BY fecha_salida LIMIT %s
+        ''', (muestra,))
+        vuelos = cur.fetchall()
+        cur.execute('SELECT id, apellido, pasaporte FROM pasajeros TABLESAMPLE SYSTEM (1) LIMIT %s', (muestra,))
+        pasajeros = cur.fetchall()
+        if not pasajeros:
+            cur.execute('SELECT id, apellido, pasaporte FROM pasajeros LIMIT %s', (muestra,))
+            pasajeros = cur.fetchall()
+        cur.execute('''
+            SELECT id FROM reservas TABLESAMPLE SYSTEM (1) WHERE estado = 'confirmada' LIMIT %s
+        ''', (muestra,))
+        reservas = [fila[0] for fila in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+    random.Random(0).shuffle(reservas)
+    return {
+        'vuelos': [fila[0] for fila in vuelos],
+        'rutas': sorted({(fila[1], fila[2]) for fila in vuelos}),
+        'pasajeros': [fila[0] for fila in pasajeros],
+        'prefijos': sorted({fila[1][:3] for fila in pasajeros} | {fila[2][:4] for fila in pasajeros}),
+        'reservas': reservas,
+    }
+
+
+class Servidor:
+    """gunicorn con la app en `puerto` y `argumentos`; se para al salir del `with`"""
+
+    def __init__(self, argumentos, puerto):
+        self.url = f'http://127.0.0.1:{puerto}'
+        self._comando = [sys.executable, '-m', 'gunicorn', 'app:app', *argumentos,
+                         '--bind', f'127.0.0.1:{puerto}', '--log-level', 'warning']
+        self._proceso = None
+
+    def __enter__(self):
+        entorno = dict(os.environ, METRICAS_DIR=tempfile.mkdtemp(prefix='metricas_carga_'))
+        self._proceso = subprocess.Popen(self._comando, cwd=DIRECTORIO_APP, env=entorno)
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            if self._proceso.poll() is not None:
+                raise RuntimeError(f'gunicorn terminó con código {self._proceso.returncode}')
+            try:
+                urllib.request.urlopen(self.url + '/login', timeout=2).read()
+                return self
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.5)
+        self.__exit__()
+        raise RuntimeError('gunicorn no respondió en 60 s')
+
+    def __exit__(self, *exc):
+        if self._proceso is not None and self._proceso.poll() is None:
+            self._proceso.terminate()
+            try:
+                self._proceso.wait(30)
+            except subprocess.TimeoutExpired:
+                self._proceso.kill()
+
+
+# ==================== CLIENTES ====================
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    # Tras reservar o cancelar la app redirige a /reservas, que lista todas las
+    # reservas: no se sigue, la redirección ya es la respuesta
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Cliente:
+    """Un usuario que repite operaciones de la mezcla y anota cada petición"""
+
+    def __init__(self, base, usuario, clave, datos, rng, anotar):
+        self.base = base
+        self.usuario = usuario
+        self.clave = clave
+        self.datos = datos
+        self.rng = rng
+        self.anotar = anotar
+        self._abrir = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SinRedirecciones()).open
+
+    def pedir(self, operacion, ruta, formulario=None, esperado=(200,)):
+        datos = urllib.parse.urlencode(formulario).encode() if formulario is not None else None
+        inicio = time.perf_counter()
+        try:
+            with self._abrir(self.base + ruta, data=datos, timeout=60) as respuesta:
+                respuesta.read()
+                estado = respuesta.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            estado = e.code
+        except (urllib.error.URLError, OSError):
+            estado = 0
+        self.anotar(operacion, time.perf_counter() - inicio, estado, estado in esperado)
+        return estado
+
+    def iniciar_sesion(self):
+        return self.pedir('login', '/login', {'username': self.usuario, 'password': self.clave}, esperado=(302,))
+
+    def operacion(self, nombre):
+        rng, datos = self.rng, self.datos
+        if nombre == 'dashboard':
+            self.pedir(nombre, '/dashboard')
+        elif nombre == 'vuelos':
+            filtro = rng.choice(['', '?estado=programado', '?estado=aterrizado',
+                                 f'?desde={date.today().isoformat()}'])
+            self.pedir(nombre, '/vuelos' + filtro)
+        elif nombre == 'buscar' and datos['rutas']:
+            origen, destino = rng.choice(datos['rutas'])
+            self.pedir(nombre, '/vuelos/buscar?' + urllib.parse.urlencode({'origen': origen, 'destino': destino}))
+        elif nombre == 'pasajeros':
+            q = rng.choice(datos['prefijos']) if datos['prefijos'] and rng.random() < 0.7 else ''
+            self.pedir(nombre, '/pasajeros' + (f'?q={urllib.parse.quote(q)}' if q else ''))
+        elif nombre == 'sugerencias' and datos['prefijos']:
+            self.pedir(nombre, f'/pasajeros/sugerencias?q={urllib.parse.quote(rng.choice(datos["prefijos"]))}')
+        elif nombre == 'api_vuelos':
+            self.pedir(nombre, '/api/vuelos?limite=100&estado=programado')
+        elif nombre == 'pasajeros_vuelo' and datos['vuelos']:
+            self.pedir(nombre, f'/vuelos/{rng.choice(datos["vuelos"])}/pasajeros')
+        elif nombre == 'form_reserva':
+            self.pedir(nombre, '/reservas/nueva')
+        elif nombre == 'reservar' and datos['vuelos'] and datos['pasajeros']:
+            # 302 = reserva creada; 200 = formulario otra vez (p. ej. sin asientos en esa clase)
+            self.pedir(nombre, '/reservas/nueva', {
+                'vuelo_id': rng.choice(datos['vuelos']),
+                'pasajero_id': rng.choice(datos['pasajeros']),
+                'clase': rng.choices(['economica', 'ejecutiva', 'primera'], [85, 12, 3])[0],
+                'precio': f'{rng.uniform(80, 900):.2f}',
+                'asiento': '',
+            }, esperado=(302,))
+        elif nombre == 'cancelar' and datos['reservas']:
+            try:
+                reserva_id = datos['reservas'].pop()
+            except IndexError:
+                return
+            self.pedir(nombre, f'/reservas/cancelar/{reserva_id}', {}, esperado=(302,))
+        elif nombre == 'login':
+            self.pedir('logout', '/logout', esperado=(302,))
+            self.iniciar_sesion()
+        elif nombre == 'reservas':
+            self.pedir(nombre, '/reservas')
+
+
+class Registro:
+    """Latencias y resultados por operación, solo dentro de la ventana de medida"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}
+        self.midiendo = False
+
+    def anotar(self, operacion, segundos, estado, correcto):
+        if not self.midiendo:
+            return
+        with self._lock:
+            d = self._datos.setdefault(operacion, {'latencias': [], 'errores': 0, 'estados': {}})
+            d['latencias'].append(segundos)
+            d['errores'] += not correcto
+            d['estados'][str(estado)] = d['estados'].get(str(estado), 0) + 1
+
+    def resumen(self, duracion):
+        def calcular(latencias, errores, estados=None):
+            ordenadas = sorted(latencias)
+            n = len(ordenadas)
+            fila = {
+                'peticiones': n,
+                'por_segundo': round(n / duracion, 2),
+                'errores': errores,
+                'tasa_error': round(errores / n, 4) if n else 0.0,
+                'media_ms': round(sum(ordenadas) / n * 1000, 2) if n else 0.0,
+                'max_ms': round(ordenadas[-1] * 1000, 2) if n else 0.0,
+            }
+            for p in PERCENTILES:
+                fila[f'p{p}_ms'] = round(percentil(ordenadas, p) * 1000, 2)
+            if estados is not None:
+                fila['estados'] = estados
+            return fila
+
+        with self._lock:
+            rutas = {op: calcular(d['latencias'], d['errores'], d['estados']) for op, d in sorted(self._datos.items())}
+            todas = [x for d in self._datos.values() for x in d['latencias']]
+            total = calcular(todas, sum(d['errores'] for d in self._datos.values()))
+        return rutas, total
+
+
+def ejecutar_carga(base, args, datos, mezcla):
+    registro = Registro()
+    operaciones = [op for op, peso in mezcla.items() if peso > 0]
+    pesos = [mezcla[op] for op in operaciones]
+    parar = threading.Event()
+
+    def cliente(n):
+        rng = random.Random(f'{args.semilla}:{n}')
+        c = Cliente(base, args.usuario, args.clave, datos, rng, registro.anotar)
+        c.iniciar_sesion()
+        while not parar.is_set():
+            c.operacion(rng.choices(operaciones, pesos)[0])
+
+    hilos = [threading.Thread(target=cliente, args=(n,), daemon=True) for n in range(args.clientes)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(args.calentamiento)
+    registro.midiendo = True
+    inicio = time.monotonic()
+    time.sleep(args.duracion)
+    registro.midiendo = False
+    duracion = time.monotonic() - inicio
+    parar.set()
+    for hilo in hilos:
+        hilo.join(60)
+    return registro.resumen(duracion)
+
+
+def estado_servidor(base, usuario, clave):
+    """/admin/estado al terminar (pool, cachés...), si el usuario es admin"""
+    registro = []
+    c = Cliente(base, usuario, clave, None, None, lambda *a: registro.append(a))
+    c.iniciar_sesion()
+    try:
+        with c._abrir(base + '/admin/estado', timeout=30) as respuesta:
+            return json.loads(respuesta.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+# ==================== RESULTADOS ====================
+
+def imprimir(rutas, total):
+    print(f'  {"ruta":<16} {"pet.":>7} {"pet/s":>8} {"err":>5} {"p50":>8} {"p95":>8} {"p99":>8} {"max":>8}')
+    for nombre, f in list(rutas.items()) + [('TOTAL', total)]:
+        print(f'  {nombre:<16} {f["peticiones"]:>7} {f["por_segundo"]:>8.1f} {f["errores"]:>5} '
+              f'{f["p50_ms"]:>6.1f}ms {f["p95_ms"]:>6.1f}ms {f["p99_ms"]:>6.1f}ms {f["max_ms"]:>6.0f}ms')
+
+
+def comparar(ruta_antes, ruta_despues, tolerancia, minimo=20):
+    """Imprime las diferencias por ruta; True si ninguna empeora más de `tolerancia` %"""
+    with open(ruta_antes, encoding='utf-8') as f:
+        antes = json.load(f)
+    with open(ruta_despues, encoding='utf-8') as f:
+        despues = json.load(f)
+    print(f'{antes["commit"]} ({antes["escala"]} reservas) -> {despues["commit"]} ({despues["escala"]} reservas)')
+    if antes['escala'] != despues['escala']:
+        print('⚠️  Escalas distintas: la comparación es orientativa')
+    print(f'  {"ruta":<16} {"p95 antes":>10} {"p95 ahora":>10} {"Δ":>7}  {"pet/s antes":>11} {"pet/s ahora":>11} {"Δ":>7}')
+    regresiones = []
+    for nombre in sorted(set(antes['rutas']) & set(despues['rutas'])) + ['TOTAL']:
+        a = antes['total'] if nombre == 'TOTAL' else antes['rutas'][nombre]
+        d = despues['total'] if nombre == 'TOTAL' else despues['rutas'][nombre]
+        dp95 = (d['p95_ms'] / a['p95_ms'] - 1) * 100 if a['p95_ms'] else 0.0
+        drps = (d['por_segundo'] / a['por_segundo'] - 1) * 100 if a['por_segundo'] else 0.0
+        marca = ''
+        if min(a['peticiones'], d['peticiones']) >= minimo and (dp95 > tolerancia or drps < -tolerancia):
+            regresiones.append(nombre)
+            marca = '  ❌'
+        print(f'  {nombre:<16} {a["p95_ms"]:>8.1f}ms {d["p95_ms"]:>8.1f}ms {dp95:>+6.1f}%  '
+              f'{a["por_segundo"]:>11.1f} {d["por_segundo"]:>11.1f} {drps:>+6.1f}%{marca}')
+    if regresiones:
+        print(f'❌ Empeoran más de un {tolerancia}%: {", ".join(regresiones)}')
+        return False
+    print('✅ Sin regresiones')
+    return True
+
+
+def parsear_mezcla(textos):
+    mezcla = dict(MEZCLA)
+    for texto in textos or []:
+        nombre, _, peso = texto.partition('=')
+        if nombre not in MEZCLA or not peso.isdigit():
+            raise SystemExit(f'--mezcla: se espera operación=peso con operación en {", ".join(MEZCLA)}')
+        mezcla[nombre] = int(peso)
+    return mezcla
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escalas', type=int, nargs='+', default=[10000, 100000], help='reservas por escala')
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=60, help='segundos medidos por escala')
+    parser.add_argument('--calentamiento', type=float, default=10, help='segundos sin medir antes')
+    parser.add_argument('--workers', type=int, help='workers de gunicorn (por defecto, los de render.yaml)')
+    parser.add_argument('--threads', type=int, help='hilos por worker de gunicorn (por defecto, los de render.yaml)')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--url', help='usar un servidor ya arrancado en vez de gunicorn')
+    parser.add_argument('--sin-sembrar', action='store_true', help='usar los datos que ya hay en la base')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--hoy', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--usuario', default='admin')
+    parser.add_argument('--clave', default='admin123')
+    parser.add_argument('--mezcla', nargs='*', metavar='OPERACION=PESO')
+    parser.add_argument('--salida', default=DIRECTORIO_RESULTADOS)
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DESPUES'))
+    parser.add_argument('--tolerancia', type=float, default=10, help='porcentaje de empeoramiento admitido')
+    args = parser.parse_args()
+
+    if args.comparar:
+        return 0 if comparar(*args.comparar, args.tolerancia) else 1
+
+    mezcla = parsear_mezcla(args.mezcla)
+    # Mismo gunicorn que en producción salvo que se pida otra cosa; gunicorn
+    # se queda con la última aparición de cada opción
+    produccion = argumentos_produccion()
+    argumentos = list(produccion)
+    if args.workers:
+        argumentos += ['--workers', str(args.workers)]
+    if args.threads:
+        argumentos += ['--threads', str(args.threads)]
+    commit = commit_actual()
+    escalas = [None] if args.sin_sembrar else args.escalas
+    os.makedirs(args.salida, exist_ok=True)
+    for escala in escalas:
+        if escala is not None:
+            print(f'→ Sembrando {escala} reservas (semilla {args.semilla})')
+            sembrar(escala, args.semilla, args.hoy)
+        datos = datos_de_prueba()
+        print(f'→ Carga: {args.clientes} clientes, {args.calentamiento:g}s de calentamiento + {args.duracion:g}s')
+        if args.url:
+            rutas, total = ejecutar_carga(args.url, args, datos, mezcla)
+            estado = estado_servidor(args.url, args.usuario, args.clave)
+        else:
+            with Servidor(argumentos, args.puerto) as servidor:
+                rutas, total = ejecutar_carga(servidor.url, args, datos, mezcla)
+                estado = estado_servidor(servidor.url, args.usuario, args.clave)
+        imprimir(rutas, total)
+
+        resultado = {
+            'commit': commit,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'escala': escala,
+            'semilla': args.semilla,
+            'config': {
+                'clientes': args.clientes, 'duracion': args.duracion, 'calentamiento': args.calentamiento,
+                'gunicorn': None if args.url else argumentos, 'gunicorn_produccion': produccion,
+                'como_produccion': not args.url and argumentos == produccion,
+                'url': args.url, 'mezcla': mezcla,
+            },
+            'entorno': {'python': platform.python_version(), 'sistema': platform.platform(),
+                        'cpus': os.cpu_count()},
+            'rutas': rutas,
+            'total': total,
+            'servidor': estado,
+        }
+        nombre = f'carga_{escala or "actual"}_{commit}_{datetime.now():%Y%m%d_%H%M%S}.json'
+        ruta = os.path.join(args.salida, nombre)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f'  resultados en {ruta}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+BENCHMARK: ASIGNACIÓN DE ASIENTOS CON EL MAPA EN MEMORIA
+
+Uso (desde sistema_vuelos/):
+    python benchmarks/mapa_asientos.py [--capacidad 180 400] [--grupo 3]
+
+Llena un vuelo asiento a asiento (y luego por grupos) y mide cuánto tarda
+cada asignación. No necesita base de datos.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mapa_asientos import MapaAsientos  # noqa: E402
+
+
+def medir_llenado(capacidad, n):
+    """Tiempos (en µs) de cada asignación hasta llenar el avión"""
+    mapa = MapaAsientos(capacidad)
+    tiempos = []
+    while True:
+        inicio = time.perf_counter()
+        elegidos = mapa.asignar_grupo(None, n)
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+        if elegidos is None:
+            return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capacidad', type=int, nargs='+', default=[180, 400])
+    parser.add_argument('--grupo', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"capacidad":>9} {"grupo":>5} {"construir":>11} {"mediana":>10} {"p99":>10} {"máximo":>10}')
+    for capacidad in args.capacidad:
+        inicio = time.perf_counter()
+        MapaAsientos(capacidad, ocupados=[f'{f}A' for f in range(1, capacidad // 6)])
+        construir = (time.perf_counter() - inicio) * 1e6
+        for n in (1, args.grupo):
+            tiempos = sorted(medir_llenado(capacidad, n))
+            p99 = tiempos[int(len(tiempos) * 0.99) - 1]
+            print(f'{capacidad:>9} {n:>5} {construir:9.1f}µs {statistics.median(tiempos):8.2f}µs '
+                  f'{p99:8.2f}µs {tiempos[-1]:8.2f}µs')
+
+
+if __name__ == '__main__':
+    main()
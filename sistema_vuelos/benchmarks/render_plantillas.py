@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+BENCHMARK: RENDER DEL LISTADO DE VUELOS, F-STRINGS VS PLANTILLA JINJA
+
+Uso (desde sistema_vuelos/):
+    python benchmarks/render_plantillas.py [--filas 1000 10000] [--repeticiones 5]
+
+No necesita base de datos: las filas se generan en memoria.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g  # noqa: E402
+
+import app as aplicacion  # noqa: E402
+
+ESTADOS = ['programado', 'en_vuelo', 'aterrizado', 'cancelado']
+
+
+def generar_vuelos(n):
+    salida = datetime(2025, 1, 1, 6, 0)
+    return [{
+        'id': i,
+        'numero_vuelo': f'AV{i:05d}',
+        'aerolinea_id': 1,
+        'aerolinea_codigo': 'AV',
+        'aerolinea_nombre': 'Aerovías',
+        'origen': 'MEX',
+        'destino': 'CUN',
+        'fecha_salida': salida + timedelta(minutes=i),
+        'fecha_llegada': salida + timedelta(minutes=i + 150),
+        'estado': ESTADOS[i % len(ESTADOS)],
+        'capacidad': 180,
+        'asientos_disponibles': i % 181,
+        'precio': 1500.0,
+        'puerta_embarque': 'A1',
+    } for i in range(n)]
+
+
+def render_fstring(vuelos, rol):
+    """Construcción por concatenación de f-strings, como hacía antes la ruta /vuelos"""
+    vuelos_html = ''
+    for vuelo in vuelos:
+        estado_color = {'programado':'success','en_vuelo':'warning','aterrizado':'info','cancelado':'danger'}.get(vuelo['estado'],'secondary')
+        vuelos_html += f'''
+        <tr>
+            <td><strong>{vuelo["numero_vuelo"]}</strong></td>
+            <td>{vuelo["aerolinea_codigo"]}</td>
+            <td>{vuelo["origen"]}</td>
+            <td>{vuelo["destino"]}</td>
+            <td>{vuelo["fecha_salida"].strftime('%d/%m %H:%M')}</td>
+            <td>{vuelo["fecha_llegada"].strftime('%d/%m %H:%M')}</td>
+            <td><span class="badge bg-{estado_color}">{vuelo["estado"]}</span></td>
+            <td>{vuelo["asientos_disponibles"]}/{vuelo["capacidad"]}</td>
+            <td>
+                <div class="btn-group btn-group-sm">
+                    <a href="/vuelos/{vuelo["id"]}/pasajeros" class="btn btn-info"><i class="bi bi-people"></i></a>
+        '''
+        if rol in ['admin','responsable']:
+            vuelos_html += f'<a href="/vuelos/editar/{vuelo["id"]}" class="btn btn-warning"><i class="bi bi-pencil"></i></a>'
+        if rol == 'admin':
+            vuelos_html += f'''
+            <form method="POST" action="/vuelos/eliminar/{vuelo["id"]}" class="d-inline">
+                <button type="submit" class="btn btn-danger" onclick="return confirm('¿Eliminar vuelo?')"><i class="bi bi-trash"></i></button>
+            </form>
+            '''
+        vuelos_html += '</div></td></tr>'
+    return f'''
+    <!DOCTYPE html>
+    <html>
+    <head><meta charset="UTF-8"><title>Vuelos</title></head>
+    <body>
+        <div class="container">
+            <table class="table table-hover"><tbody>{vuelos_html}</tbody></table>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+def render_plantilla(vuelos):
+    """Render completo de vuelos/listar.html (hereda de base.html)"""
+    plantilla = aplicacion.app.jinja_env.get_template('vuelos/listar.html')
+    contexto = {'vuelos': vuelos, 'aerolineas': [], 'filtros': {},
+                'paginacion': {'anterior': None, 'siguiente': None}, 'mensajes': []}
+    aplicacion.app.update_template_context(contexto)
+    return plantilla.render(contexto)
+
+
+def render_plantilla_stream(vuelos):
+    """Igual que el anterior pero consumiendo el stream por bloques, como la ruta"""
+    plantilla = aplicacion.app.jinja_env.get_template('vuelos/listar.html')
+    contexto = {'vuelos': vuelos, 'aerolineas': [], 'filtros': {},
+                'paginacion': {'anterior': None, 'siguiente': None}, 'mensajes': []}
+    aplicacion.app.update_template_context(contexto)
+    flujo = plantilla.stream(contexto)
+    flujo.enable_buffering(100)
+    return sum(len(bloque) for bloque in flujo)
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), min(tiempos)
+
+
+def medir_compilacion():
+    """Carga de la plantilla sin caché en memoria: con y sin bytecode en disco"""
+    entorno = aplicacion.app.jinja_env
+    resultados = {}
+    for etiqueta, bytecode in (('compilando', None), ('bytecode en disco', entorno.bytecode_cache)):
+        original = entorno.bytecode_cache
+        entorno.bytecode_cache = bytecode
+        try:
+            def cargar():
+                entorno.cache.clear()
+                entorno.get_template('vuelos/listar.html')
+            resultados[etiqueta] = medir(cargar, 20)
+        finally:
+            entorno.bytecode_cache = original
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[200, 1000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    usuario = aplicacion.User(1, 'admin', 'Administrador', 'admin')
+    with aplicacion.app.test_request_context('/vuelos'):
+        g._login_user = usuario
+        aplicacion.precompilar_plantillas()
+
+        print('Carga de vuelos/listar.html (mediana / mínimo):')
+        for etiqueta, (mediana, minimo) in medir_compilacion().items():
+            print(f'  {etiqueta:<20} {mediana * 1000:8.2f} ms / {minimo * 1000:8.2f} ms')
+        print()
+
+        print(f'{"filas":>7} {"método":<22} {"mediana":>10} {"mínimo":>10} {"por fila":>10}')
+        for n in args.filas:
+            vuelos = generar_vuelos(n)
+            metodos = [
+                ('f-strings', lambda: render_fstring(vuelos, usuario.rol)),
+                ('jinja render', lambda: render_plantilla(vuelos)),
+                ('jinja stream', lambda: render_plantilla_stream(vuelos)),
+            ]
+            for nombre, funcion in metodos:
+                mediana, minimo = medir(funcion, args.repeticiones)
+                print(f'{n:>7} {nombre:<22} {mediana * 1000:8.2f}ms {minimo * 1000:8.2f}ms '
+                      f'{mediana / n * 1e6:8.2f}µs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+CACHÉ EN MEMORIA CON TTL Y EXPULSIÓN LRU
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+    """Caché por proceso: cada entrada caduca a los `ttl` segundos y, al
+    superar `maximo` entradas, se expulsa la menos usada recientemente."""
+
+    def __init__(self, ttl=60.0, maximo=1024):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsiones = 0
+
+    def obtener(self, clave, defecto=None):
+        ahora = time.monotonic()
+        with self._lock:
+            item = self._datos.get(clave, _AUSENTE)
+            if item is _AUSENTE or item[0] <= ahora:
+                if item is not _AUSENTE:
+                    del self._datos[clave]
+                self._fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self._aciertos += 1
+            return item[1]
+
+    def guardar(self, clave, valor, ttl=None):
+        caduca = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (caduca, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+                self._expulsiones += 1
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._datos),
+                'maximo': self.maximo,
+                'ttl': self.ttl,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'expulsiones': self._expulsiones,
+            }
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+HASH DE CONTRASEÑAS ACOTADO Y LÍMITE DE INTENTOS DE LOGIN
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class ClavesOcupado(Exception):
+    """No hay hueco para calcular un hash dentro del tiempo de espera"""
+
+
+def coste_de(password_hash):
+    """Factor de coste de un hash bcrypt ('$2b$12$...' -> 12), o None si no se reconoce"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class HasherClaves:
+    """Calcula y comprueba hashes bcrypt en un pool de hilos acotado.
+
+    Como mucho `concurrentes` hashes a la vez por worker; una petición que no
+    consigue hueco en `espera` segundos recibe ClavesOcupado en vez de
+    quedarse en cola. bcrypt suelta el GIL, así que mientras tanto el resto
+    de hilos del worker siguen atendiendo. Solo sirve con workers de varios
+    hilos (gthread, ver render.yaml): un worker sync atiende una petición a
+    la vez y el límite nunca llega a esperar.
+    """
+
+    def __init__(self, coste=12, concurrentes=2, espera=2.0):
+        self.coste = coste
+        self.concurrentes = concurrentes
+        self.espera = espera
+        self._stats = {'hashes': 0, 'comprobaciones': 0, 'rechazados': 0}
+        self._iniciar_estado()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        # Los hilos del pool no sobreviven a un fork: cada worker crea el suyo
+        self._lock = threading.Lock()
+        self._huecos = threading.BoundedSemaphore(self.concurrentes)
+        self._pool = None
+        self._pid = None
+
+    def _ejecutor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.concurrentes, thread_name_prefix='bcrypt')
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _ejecutar(self, contador, funcion, *args):
+        if not self._huecos.acquire(timeout=self.espera):
+            with self._lock:
+                self._stats['rechazados'] += 1
+            raise ClavesOcupado('Demasiados inicios de sesión a la vez; inténtalo en unos segundos')
+        try:
+            resultado = self._ejecutor().submit(funcion, *args).result()
+        finally:
+            self._huecos.release()
+        with self._lock:
+            self._stats[contador] += 1
+        return resultado
+
+    def hash(self, password):
+        """Hash bcrypt (texto) con el coste configurado"""
+        return self._ejecutar('hashes', lambda p: bcrypt.hashpw(p, bcrypt.gensalt(self.coste)).decode('utf-8'),
+                              password.encode('utf-8'))
+
+    def comprobar(self, password, password_hash):
+        return self._ejecutar('comprobaciones', bcrypt.checkpw, password.encode('utf-8'),
+                              password_hash.encode('utf-8'))
+
+    def necesita_rehash(self, password_hash):
+        return coste_de(password_hash) != self.coste
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos.update(coste=self.coste, concurrentes=self.concurrentes)
+        return datos
+
+
+class LimitadorIntentos:
+    """Cuenta los intentos fallidos por clave ('ip:...', 'usuario:...') en ventanas fijas.
+
+    Al llegar a `maximo` fallos dentro de `ventana` segundos la clave queda
+    bloqueada hasta que termina la ventana. Por worker y en memoria, con
+    como mucho `max_claves` claves (se olvidan las más antiguas).
+    """
+
+    def __init__(self, maximo, ventana=900.0, max_claves=10000):
+        self.maximo = maximo
+        self.ventana = ventana
+        self.max_claves = max_claves
+        self._lock = threading.Lock()
+        self._fallos = OrderedDict()
+
+    def espera(self, clave):
+        """Segundos que le quedan de bloqueo a la clave (0 si puede intentarlo)"""
+        ahora = time.monotonic()
+        with self._lock:
+            item = self._fallos.get(clave)
+            if item is None:
+                return 0
+            fin, n = item
+            if fin <= ahora:
+                del self._fallos[clave]
+                return 0
+            return fin - ahora if n >= self.maximo else 0
+
+    def fallo(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            fin, n = self._fallos.get(clave, (0, 0))
+            if fin <= ahora:
+                fin, n = ahora + self.ventana, 0
+            self._fallos[clave] = (fin, n + 1)
+            self._fallos.move_to_end(clave)
+            while len(self._fallos) > self.max_claves:
+                self._fallos.popitem(last=False)
+
+    def olvidar(self, clave):
+        with self._lock:
+            self._fallos.pop(clave, None)
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            bloqueadas = sum(1 for fin, n in self._fallos.values() if fin > ahora and n >= self.maximo)
+            return {'claves': len(self._fallos), 'bloqueadas': bloqueadas,
+                    'maximo': self.maximo, 'ventana': self.ventana}
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+POOL DE CONEXIONES A POSTGRESQL
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# En Render la URL llega por variable de entorno (render.yaml); en local se
+# usa la base de desarrollo
+DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/sistema_vuelos')
+
+
+def crear_conexion():
+    """Abre una conexión nueva a PostgreSQL (la usan el pool de la app y los scripts)"""
+    try:
+        if os.environ.get('DB_HOST'):
+            # Conexión para Render (con SSL)
+            return psycopg2.connect(
+                host=os.environ.get('DB_HOST'),
+                database=os.environ.get('DB_NAME'),
+                user=os.environ.get('DB_USER'),
+                password=os.environ.get('DB_PASSWORD'),
+                port=os.environ.get('DB_PORT', 5432),
+                sslmode='require'
+            )
+        if 'RENDER' in os.environ:
+            return psycopg2.connect(DATABASE_URL, sslmode='require')
+        return psycopg2.connect(DATABASE_URL)
+    except Exception as e:
+        print(f"❌ Error de conexión: {e}")
+        raise
+
+
+class PoolAgotado(Exception):
+    """No se pudo obtener una conexión del pool dentro del tiempo de espera"""
+
+
+class _Entrada:
+    __slots__ = ('conn', 'creada', 'usos', 'devuelta')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.devuelta = self.creada
+        self.usos = 0
+
+
+class PoolConexiones:
+    """Pool de conexiones por proceso.
+
+    - minimo/maximo: conexiones que se mantienen abiertas / límite total; las
+      del mínimo se abren en el primer préstamo de cada proceso y se reponen
+      en el siguiente préstamo si al reciclar quedan menos
+    - timeout: segundos de espera máxima al pedir una conexión
+    - max_usos / max_edad: reciclar la conexión tras N préstamos o N segundos
+    - verificar_tras: si la conexión estuvo ociosa más de N segundos se
+      comprueba con SELECT 1 antes de entregarla
+    """
+
+    def __init__(self, fabrica, minimo=1, maximo=10, timeout=5.0,
+                 max_usos=1000, max_edad=1800.0, verificar_tras=30.0):
+        self._fabrica = fabrica
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.max_usos = max_usos
+        self.max_edad = max_edad
+        self.verificar_tras = verificar_tras
+        self._heredadas = []
+        self._iniciar_estado()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+
+    def _iniciar_estado(self):
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._libres = deque()
+        self._prestadas = {}
+        self._total = 0
+        self._reponer = True
+        self._stats = {
+            'prestamos': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'timeouts': 0,
+            'creadas': 0,
+            'descartadas': 0,
+            'fallidas': 0,
+            'pico_en_uso': 0,
+        }
+
+    def _reiniciar_tras_fork(self):
+        # Las conexiones heredadas comparten el socket con el proceso padre:
+        # no se cierran (cerrar enviaría Terminate al servidor) ni se liberan,
+        # simplemente se dejan de usar en el hijo.
+        self._heredadas.extend(e.conn for e in self._libres)
+        self._heredadas.extend(e.conn for e in self._prestadas.values())
+        self._iniciar_estado()
+
+    # ---------- préstamo / devolución ----------
+
+    def obtener(self):
+        """Presta una conexión sana; espera hasta `timeout` si el pool está lleno"""
+        if os.getpid() != self._pid:
+            self._reiniciar_tras_fork()
+        if self._reponer:
+            self._reponer = False
+            try:
+                self.precalentar()
+            except Exception as e:
+                # El préstamo lo vuelve a intentar y es el que falla
+                print(f"❌ Error abriendo el mínimo del pool: {e}")
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        esperado = False
+        while True:
+            crear = False
+            with self._cond:
+                while not self._libres and self._total >= self.maximo:
+                    esperado = True
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolAgotado(
+                            f'Sin conexiones libres tras {self.timeout}s (máximo {self.maximo})')
+                    self._cond.wait(restante)
+                if self._libres:
+                    entrada = self._libres.pop()
+                else:
+                    self._total += 1
+                    crear = True
+
+            if crear:
+                entrada = self._crear()
+            elif not self._sana(entrada):
+                self._descartar(entrada)
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                entrada.usos += 1
+                self._prestadas[id(entrada.conn)] = entrada
+                s = self._stats
+                s['prestamos'] += 1
+                if esperado:
+                    s['esperas'] += 1
+                s['tiempo_espera_total'] += espera
+                s['tiempo_espera_max'] = max(s['tiempo_espera_max'], espera)
+                s['pico_en_uso'] = max(s['pico_en_uso'], len(self._prestadas))
+            return entrada.conn
+
+    def devolver(self, conn, descartar=False):
+        """Devuelve una conexión prestada; se recicla si está rota o agotada"""
+        with self._cond:
+            entrada = self._prestadas.pop(id(conn), None)
+        if entrada is None:
+            # Conexión ajena o heredada de otro proceso
+            return
+        if not descartar and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        ahora = time.monotonic()
+        if (descartar or conn.closed or entrada.usos >= self.max_usos
+                or ahora - entrada.creada >= self.max_edad):
+            self._descartar(entrada)
+            return
+        entrada.devuelta = ahora
+        with self._cond:
+            self._libres.append(entrada)
+            self._cond.notify()
+
+    def _crear(self):
+        """Abre una conexión para un hueco ya contado en `_total`"""
+        try:
+            entrada = _Entrada(self._fabrica())
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._stats['fallidas'] += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['creadas'] += 1
+        return entrada
+
+    def _sana(self, entrada):
+        conn = entrada.conn
+        if conn.closed:
+            return False
+        ahora = time.monotonic()
+        if entrada.usos >= self.max_usos or ahora - entrada.creada >= self.max_edad:
+            return False
+        if ahora - entrada.devuelta >= self.verificar_tras:
+            try:
+                cur = conn.cursor()
+                cur.execute('SELECT 1')
+                cur.close()
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _descartar(self, entrada):
+        try:
+            entrada.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._stats['descartadas'] += 1
+            if self._total < self.minimo:
+                self._reponer = True
+            self._cond.notify()
+
+    # ---------- administración ----------
+
+    def precalentar(self):
+        """Abre conexiones libres hasta alcanzar `minimo`"""
+        while True:
+            with self._cond:
+                if self._total >= self.minimo:
+                    return
+                self._total += 1
+            entrada = self._crear()
+            with self._cond:
+                self._libres.append(entrada)
+                self._cond.notify()
+
+    def cerrar(self):
+        """Cierra las conexiones libres (las prestadas se descartan al devolverse)"""
+        with self._cond:
+            libres = list(self._libres)
+            self._libres.clear()
+        for entrada in libres:
+            self._descartar(entrada)
+
+    def estadisticas(self):
+        with self._cond:
+            datos = dict(self._stats)
+            en_uso = len(self._prestadas)
+            datos.update({
+                'pid': self._pid,
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'abiertas': self._total,
+                'libres': len(self._libres),
+                'en_uso': en_uso,
+                'saturacion': round(en_uso / self.maximo, 3) if self.maximo else 0,
+            })
+        prestamos = datos['prestamos']
+        datos['tiempo_espera_medio'] = datos['tiempo_espera_total'] / prestamos if prestamos else 0.0
+        return datos
+
+
+class CursorMedido:
+    """Cursor que avisa a `al_ejecutar(cur, sql, params, segundos)` tras cada consulta.
+
+    `cur` es el cursor de psycopg2 de debajo. Solo se mide
+    execute/executemany/callproc/copy_expert (con params=None salvo en
+    execute); lo que tarda en llegar cada bloque de un cursor con nombre al
+    iterarlo no se cuenta.
+    """
+
+    __slots__ = ('_cur', '_al_ejecutar')
+
+    def __init__(self, cur, al_ejecutar):
+        object.__setattr__(self, '_cur', cur)
+        object.__setattr__(self, '_al_ejecutar', al_ejecutar)
+
+    def _medir(self, sql, params, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, *args)
+        finally:
+            self._al_ejecutar(self._cur, sql, params, time.perf_counter() - inicio)
+
+    def execute(self, sql, params=None):
+        return self._medir(sql, params, self._cur.execute, params)
+
+    def executemany(self, sql, params_seq):
+        return self._medir(sql, None, self._cur.executemany, params_seq)
+
+    def callproc(self, nombre, params=None):
+        return self._medir(nombre, None, self._cur.callproc, params)
+
+    def copy_expert(self, sql, archivo, size=8192):
+        return self._medir(sql, None, self._cur.copy_expert, archivo, size)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __enter__(self):
+        self._cur.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cur.__exit__(*exc)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cur, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # itersize, arraysize... van al cursor de psycopg2
+        setattr(self._cur, nombre, valor)
+
+
+class ConexionPeticion:
+    """Envoltorio de la conexión compartida durante una petición.
+
+    Las rutas siguen llamando a `close()` como antes; aquí no hace nada y la
+    conexión vuelve al pool al terminar la petición. Con `al_ejecutar` los
+    cursores que se abren son CursorMedido.
+    """
+
+    __slots__ = ('_conn', '_al_ejecutar')
+
+    def __init__(self, conn, al_ejecutar=None):
+        self._conn = conn
+        self._al_ejecutar = al_ejecutar
+
+    def close(self):
+        pass
+
+    def cursor(self, *args, **kwargs):
+        cur = self._conn.cursor(*args, **kwargs)
+        return CursorMedido(cur, self._al_ejecutar) if self._al_ejecutar else cur
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
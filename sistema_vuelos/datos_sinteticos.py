@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+GENERADOR DE DATOS SINTÉTICOS
+
+Uso (desde sistema_vuelos/, con las migraciones aplicadas):
+    python datos_sinteticos.py --reservas 1000000 [--procesos 8] [--semilla 1] [--vaciar]
+
+Llena aerolineas, usuarios, pasajeros, vuelos (con sus asientos), reservas y
+logs_auditoria con datos coherentes entre sí. Por defecto el resto de
+cantidades salen de --reservas (unas 90 reservas por vuelo, un pasajero por
+cada tres reservas); se pueden fijar con --vuelos, --pasajeros, etc.
+
+Los ids se asignan aquí, a continuación de los que ya hay, así cada proceso
+carga su parte con COPY sin esperar a los demás. Cada bloque usa su propio
+generador aleatorio derivado de --semilla, de modo que con la misma semilla,
+escala y --hoy el resultado es el mismo aunque cambie --procesos (la hora
+de referencia es el mediodía de --hoy, no la hora real). Pensado
+para una base local vacía (o con --vaciar, que BORRA todo salvo el admin).
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+
+from asientos import distribucion_asientos
+from importacion import FlujoCSV
+
+BLOQUE_VUELOS = 500
+BLOQUE_PASAJEROS = 100000
+BLOQUE_LOGS = 200000
+
+# Los vuelos van de 2/3 de la ventana en el pasado a 1/3 en el futuro
+DIAS_VENTANA = 540
+RESERVAS_POR_VUELO = 90
+
+AEROLINEAS = [
+    ('AA', 'American Airlines', 'USA'), ('LA', 'LATAM Airlines', 'Chile'), ('IB', 'Iberia', 'Spain'),
+    ('AF', 'Air France', 'France'), ('LH', 'Lufthansa', 'Germany'), ('AM', 'Aeroméxico', 'Mexico'),
+    ('AV', 'Avianca', 'Colombia'), ('CM', 'Copa Airlines', 'Panama'), ('AR', 'Aerolíneas Argentinas', 'Argentina'),
+    ('UX', 'Air Europa', 'Spain'), ('VY', 'Vueling', 'Spain'), ('DL', 'Delta Air Lines', 'USA'),
+    ('UA', 'United Airlines', 'USA'), ('BA', 'British Airways', 'United Kingdom'), ('KL', 'KLM', 'Netherlands'),
+    ('TP', 'TAP Air Portugal', 'Portugal'), ('Y4', 'Volaris', 'Mexico'), ('VB', 'Viva Aerobus', 'Mexico'),
+    ('G3', 'GOL', 'Brazil'), ('JJ', 'LATAM Brasil', 'Brazil'), ('H2', 'SKY Airline', 'Chile'),
+    ('AC', 'Air Canada', 'Canada'), ('EK', 'Emirates', 'UAE'), ('QR', 'Qatar Airways', 'Qatar'),
+    ('TK', 'Turkish Airlines', 'Turkey'), ('AZ', 'ITA Airways', 'Italy'), ('LX', 'SWISS', 'Switzerland'),
+    ('FR', 'Ryanair', 'Ireland'), ('U2', 'easyJet', 'United Kingdom'), ('JL', 'Japan Airlines', 'Japan'),
+]
+
+# Código IATA, latitud, longitud (para la duración de cada ruta)
+AEROPUERTOS = [
+    ('MEX', 19.44, -99.07), ('CUN', 21.04, -86.87), ('GDL', 20.52, -103.31), ('MTY', 25.78, -100.11),
+    ('MAD', 40.47, -3.56), ('BCN', 41.30, 2.08), ('LIS', 38.77, -9.13), ('CDG', 49.01, 2.55),
+    ('FRA', 50.03, 8.56), ('AMS', 52.31, 4.76), ('LHR', 51.47, -0.45), ('FCO', 41.80, 12.25),
+    ('JFK', 40.64, -73.78), ('MIA', 25.79, -80.29), ('LAX', 33.94, -118.41), ('ORD', 41.97, -87.91),
+    ('YYZ', 43.68, -79.63), ('BOG', 4.70, -74.15), ('LIM', -12.02, -77.11), ('SCL', -33.39, -70.79),
+    ('EZE', -34.82, -58.54), ('GRU', -23.43, -46.47), ('PTY', 9.07, -79.38), ('UIO', -0.13, -78.36),
+    ('SJO', 9.99, -84.20), ('HAV', 22.99, -82.41), ('SDQ', 18.43, -69.67), ('DXB', 25.25, 55.36),
+    ('IST', 41.26, 28.74), ('NRT', 35.77, 140.39),
+]
+
+CAPACIDADES = (150, 162, 174, 180, 186, 220, 246, 288, 300)
+
+NOMBRES = ['María', 'José', 'Juan', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Laura', 'Jorge', 'Lucía', 'Pedro',
+           'Sofía', 'Miguel', 'Valentina', 'Andrés', 'Camila', 'Fernando', 'Isabel', 'Diego', 'Paula',
+           'Javier', 'Daniela', 'Ricardo', 'Gabriela', 'Alejandro', 'Elena', 'Manuel', 'Mariana', 'Raúl',
+           'Andrea', 'Francisco', 'Natalia', 'Antonio', 'Claudia', 'Sergio', 'Patricia', 'Pablo', 'Rosa',
+           'Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Lucas', 'Mia', 'Hugo', 'Chloé', 'Jonas', 'Giulia', 'Yuki']
+APELLIDOS = ['García', 'Rodríguez', 'Martínez', 'Hernández', 'López', 'González', 'Pérez', 'Sánchez',
+             'Ramírez', 'Torres', 'Flores', 'Rivera', 'Gómez', 'Díaz', 'Cruz', 'Morales', 'Reyes', 'Ortiz',
+             'Gutiérrez', 'Chávez', 'Ramos', 'Ruiz', 'Álvarez', 'Mendoza', 'Castillo', 'Jiménez', 'Moreno',
+             'Romero', 'Herrera', 'Medina', 'Aguilar', 'Vargas', 'Castro', 'Silva', 'Rojas', 'Fernández',
+             'Smith', 'Johnson', 'Brown', 'Müller', 'Schmidt', 'Dubois', 'Martin', 'Rossi', 'Bianchi',
+             'Santos', 'Oliveira', 'Costa', 'Tanaka', 'Yilmaz']
+# Nacionalidad, prefijo de pasaporte, prefijo telefónico, peso
+NACIONALIDADES = [
+    ('Mexico', 'MX', '+52', 30), ('Spain', 'ES', '+34', 15), ('USA', 'US', '+1', 12), ('Colombia', 'CO', '+57', 8),
+    ('Argentina', 'AR', '+54', 6), ('Chile', 'CL', '+56', 5), ('Peru', 'PE', '+51', 5), ('Brazil', 'BR', '+55', 5),
+    ('France', 'FR', '+33', 4), ('Germany', 'DE', '+49', 4), ('Italy', 'IT', '+39', 3), ('Canada', 'CA', '+1', 3),
+]
+PESOS_NACIONALIDAD = [n[3] for n in NACIONALIDADES]
+DOMINIOS = ['gmail.com', 'hotmail.com', 'outlook.com', 'yahoo.com', 'icloud.com', 'correo.com']
+
+ROLES = [('responsable', 2), ('empleado', 6), ('consulta', 2)]
+# Acción, tabla, peso
+ACCIONES = [('LOGIN', None, 30), ('LOGOUT', None, 12), ('CREAR', 'reservas', 25), ('CREAR', 'pasajeros', 10),
+            ('ACTUALIZAR', 'vuelos', 8), ('ACTUALIZAR', 'pasajeros', 5), ('CANCELAR', 'reservas', 5),
+            ('ELIMINAR', 'pasajeros', 1), ('CREAR', 'vuelos', 2), ('EXPORTAR', 'reservas', 1),
+            ('IMPORTAR', 'pasajeros', 1)]
+PESOS_ACCION = [a[2] for a in ACCIONES]
+
+TABLAS = ('aerolineas', 'usuarios', 'pasajeros', 'vuelos', 'reservas', 'logs_auditoria')
+
+_BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _ascii(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower().replace(' ', '')
+
+
+def codigo_reserva(reserva_id):
+    """Código de 8 caracteres único por id (biyección módulo 36^8), con aspecto aleatorio"""
+    n = (reserva_id * 2654435761) % 36 ** 8
+    return ''.join(_BASE36[(n // 36 ** i) % 36] for i in range(7, -1, -1))
+
+
+def _minutos_vuelo(origen, destino):
+    (_, la1, lo1), (_, la2, lo2) = origen, destino
+    la1, lo1, la2, lo2 = map(math.radians, (la1, lo1, la2, lo2))
+    arco = math.acos(max(-1.0, min(1.0, math.sin(la1) * math.sin(la2)
+                                    + math.cos(la1) * math.cos(la2) * math.cos(lo2 - lo1))))
+    km = 6371 * arco
+    return int(40 + km / 820 * 60) // 5 * 5
+
+
+def calcular_plan(args, bases):
+    """Cantidades, rangos de ids y ventana de fechas; lo mismo para todos los procesos"""
+    reservas = args.reservas
+    vuelos = args.vuelos or max(1, math.ceil(reservas / RESERVAS_POR_VUELO))
+    # Al menos unas decenas de números de vuelo distintos; cada uno sale una vez al día
+    numeros = min(vuelos, max(math.ceil(vuelos / DIAS_VENTANA), 40))
+    dias = math.ceil(vuelos / numeros)
+    hoy = args.hoy
+    return {
+        'semilla': args.semilla,
+        'hoy': hoy,
+        # Instante de referencia fijo (no la hora real): estado y ocupación
+        # de los vuelos salen iguales en cada ejecución y en cada bloque
+        'ahora': datetime.combine(hoy, datetime.min.time()) + timedelta(hours=12),
+        'inicio': datetime.combine(hoy - timedelta(days=dias * 2 // 3), datetime.min.time()),
+        'reservas': reservas,
+        'vuelos': vuelos,
+        'numeros': numeros,
+        'pasajeros': args.pasajeros or max(1, math.ceil(reservas / 3)),
+        'usuarios': args.usuarios,
+        'logs': reservas if args.logs is None else args.logs,
+        'bases': bases,
+    }
+
+
+def _rng(plan, *partes):
+    return random.Random(':'.join(map(str, (plan['semilla'], *partes))))
+
+
+# ==================== GENERACIÓN POR BLOQUES ====================
+
+def filas_pasajeros(plan, inicio, fin):
+    rng = _rng(plan, 'pasajeros', inicio)
+    base = plan['bases']['pasajeros']
+    for n in range(inicio, fin):
+        pasajero_id = base + n + 1
+        nacionalidad, prefijo, telefono, _ = rng.choices(NACIONALIDADES, PESOS_NACIONALIDAD)[0]
+        nombre = rng.choice(NOMBRES)
+        apellido = rng.choice(APELLIDOS)
+        if prefijo in ('MX', 'ES', 'CO', 'AR', 'CL', 'PE') and rng.random() < 0.7:
+            apellido = f'{apellido} {rng.choice(APELLIDOS)}'
+        nacimiento = plan['hoy'] - timedelta(days=rng.randrange(18 * 365, 85 * 365))
+        email = f'{_ascii(nombre)}.{_ascii(apellido.split()[0])}{pasajero_id}@{rng.choice(DOMINIOS)}'
+        yield (pasajero_id, f'{prefijo}{pasajero_id:08d}', nombre, apellido, nacionalidad, nacimiento,
+               f'{telefono} {rng.randrange(10 ** 9, 10 ** 10)}', email if rng.random() < 0.9 else None)
+
+
+def _ruta(plan, aerolineas, numero):
+    """Aerolínea, número de vuelo, origen, destino, hora, duración y capacidad de un número de vuelo"""
+    rng = _rng(plan, 'ruta', numero)
+    aerolinea_id, codigo = rng.choice(aerolineas)
+    origen, destino = rng.sample(AEROPUERTOS, 2)
+    return {
+        'aerolinea_id': aerolinea_id,
+        'numero_vuelo': f'{codigo}{plan["bases"]["vuelos"] + numero + 100}',
+        'origen': origen[0],
+        'destino': destino[0],
+        'hora': timedelta(minutes=rng.randrange(5 * 60, 23 * 60, 5)),
+        'duracion': timedelta(minutes=_minutos_vuelo(origen, destino)),
+        'capacidad': rng.choice(CAPACIDADES),
+    }
+
+
+def bloque_vuelos(plan, aerolineas, inicio, fin, reserva_inicio, cuota):
+    """Vuelos [inicio, fin) con sus reservas y asientos.
+
+    Devuelve (vuelos, reservas, asientos) como listas de filas. Las `cuota`
+    reservas del bloque se reparten según la capacidad y la ocupación de cada
+    vuelo; los ids de reserva empiezan en `reserva_inicio`.
+    """
+    rng = _rng(plan, 'vuelos', inicio)
+    ahora = plan['ahora']
+    base = plan['bases']['vuelos']
+    rutas = {}
+    vuelos = []
+    pesos = []
+    for i in range(inicio, fin):
+        numero = i % plan['numeros']
+        ruta = rutas.get(numero)
+        if ruta is None:
+            ruta = rutas[numero] = _ruta(plan, aerolineas, numero)
+        salida = plan['inicio'] + timedelta(days=i // plan['numeros']) + ruta['hora']
+        llegada = salida + ruta['duracion']
+        if rng.random() < 0.02:
+            estado = 'cancelado'
+        elif llegada <= ahora:
+            estado = 'aterrizado'
+        elif salida <= ahora:
+            estado = 'en_vuelo'
+        else:
+            estado = 'programado'
+        ocupacion = rng.uniform(0.55, 0.98)
+        if salida > ahora:
+            # Cuanto más lejos la salida, menos vendido
+            ocupacion *= max(0.1, 1 - (salida - ahora).days / 200)
+        vuelos.append([base + i + 1, ruta, salida, llegada, estado])
+        pesos.append(ruta['capacidad'] * ocupacion)
+
+    # Reparto de la cuota por restos mayores, sin pasar de la capacidad
+    total = sum(pesos) or 1
+    exactas = [cuota * p / total for p in pesos]
+    cuentas = [min(int(x), v[1]['capacidad']) for x, v in zip(exactas, vuelos)]
+    sobrantes = cuota - sum(cuentas)
+    for k in sorted(range(len(vuelos)), key=lambda k: cuentas[k] - exactas[k]):
+        if sobrantes <= 0:
+            break
+        if cuentas[k] < vuelos[k][1]['capacidad']:
+            cuentas[k] += 1
+            sobrantes -= 1
+
+    filas_vuelos, filas_reservas, filas_asientos = [], [], []
+    reserva_id = reserva_inicio
+    pasajeros = plan['pasajeros']
+    base_pasajeros = plan['bases']['pasajeros']
+    for (vuelo_id, ruta, salida, llegada, estado), n in zip(vuelos, cuentas):
+        capacidad = ruta['capacidad']
+        distribucion = distribucion_asientos(capacidad)
+        n = min(n, pasajeros)
+        ocupados = {}
+        tarifa = 40 + ruta['duracion'].total_seconds() / 60 * rng.uniform(0.9, 1.6)
+        for indice, pasajero in zip(rng.sample(range(capacidad), n), rng.sample(range(pasajeros), n)):
+            asiento, clase, _ = distribucion[indice]
+            confirmada = estado != 'cancelado' and rng.random() >= 0.04
+            if confirmada:
+                ocupados[asiento] = reserva_id
+            precio = round(tarifa * {'primera': 6, 'ejecutiva': 3}.get(clase, 1) * rng.uniform(0.8, 1.3), 2)
+            reservada = min(salida - timedelta(minutes=rng.randrange(60, 120 * 24 * 60)), ahora)
+            filas_reservas.append((reserva_id, codigo_reserva(reserva_id), vuelo_id, base_pasajeros + pasajero + 1,
+                                   asiento if confirmada else None, clase, precio,
+                                   'confirmada' if confirmada else 'cancelada', reservada))
+            reserva_id += 1
+        filas_vuelos.append((vuelo_id, ruta['numero_vuelo'], ruta['aerolinea_id'], ruta['origen'], ruta['destino'],
+                             salida, llegada, capacidad, capacidad - len(ocupados), estado))
+        for asiento, clase, fila in distribucion:
+            filas_asientos.append((vuelo_id, asiento, clase, fila, ocupados.get(asiento)))
+    return filas_vuelos, filas_reservas, filas_asientos
+
+
+def filas_logs(plan, usuarios, inicio, fin):
+    rng = _rng(plan, 'logs', inicio)
+    base = plan['bases']['logs_auditoria']
+    desde = datetime.combine(plan['hoy'], datetime.min.time()) - timedelta(days=365)
+    maximos = {
+        'reservas': plan['bases']['reservas'] + plan['reservas'],
+        'pasajeros': plan['bases']['pasajeros'] + plan['pasajeros'],
+        'vuelos': plan['bases']['vuelos'] + plan['vuelos'],
+    }
+    for n in range(inicio, fin):
+        accion, tabla, _ = rng.choices(ACCIONES, PESOS_ACCION)[0]
+        usuario_id, username = rng.choice(usuarios)
+        registro_id = rng.randrange(1, maximos[tabla] + 1) if tabla else None
+        if accion in ('LOGIN', 'LOGOUT'):
+            detalles = {'username': username}
+        elif accion in ('EXPORTAR', 'IMPORTAR'):
+            detalles = {'formato': rng.choice(['csv', 'ndjson']), 'filas': rng.randrange(10, 50000)}
+        else:
+            detalles = None
+        yield (base + n + 1, usuario_id, accion, tabla, registro_id,
+               json.dumps(detalles, ensure_ascii=False) if detalles else None,
+               f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+               desde + timedelta(seconds=rng.randrange(365 * 86400)))
+
+
+# ==================== CARGA ====================
+
+_conexion = None
+
+
+def _conectar():
+    """Una conexión por proceso de carga"""
+    global _conexion
+    if _conexion is None:
+        from conexiones import crear_conexion
+        _conexion = crear_conexion()
+        cur = _conexion.cursor()
+        # Datos desechables: no hace falta esperar al WAL en cada commit
+        cur.execute('SET synchronous_commit = off')
+        cur.close()
+        _conexion.commit()
+    return _conexion
+
+
+def _copy(cur, tabla, columnas, filas):
+    cur.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)",
+                    FlujoCSV(filas), size=1 << 16)
+
+
+def cargar_bloque(tarea):
+    """Carga un bloque en su propia transacción; devuelve {tabla: filas}"""
+    tipo, plan, extra, inicio, fin = tarea[:5]
+    conn = _conectar()
+    cur = conn.cursor()
+    try:
+        if tipo == 'pasajeros':
+            _copy(cur, 'pasajeros', ('id', 'pasaporte', 'nombre', 'apellido', 'nacionalidad', 'fecha_nacimiento',
+                                     'telefono', 'email'), filas_pasajeros(plan, inicio, fin))
+            cuentas = {'pasajeros': fin - inicio}
+        elif tipo == 'vuelos':
+            vuelos, reservas, asientos = bloque_vuelos(plan, extra, inicio, fin, *tarea[5:])
+            _copy(cur, 'vuelos', ('id', 'numero_vuelo', 'aerolinea_id', 'origen', 'destino', 'fecha_salida',
+                                  'fecha_llegada', 'capacidad', 'asientos_disponibles', 'estado'), vuelos)
+            _copy(cur, 'reservas', ('id', 'codigo_reserva', 'vuelo_id', 'pasajero_id', 'asiento', 'clase', 'precio',
+                                    'estado', 'fecha_reserva'), reservas)
+            _copy(cur, 'asientos', ('vuelo_id', 'asiento', 'clase', 'fila', 'reserva_id'), asientos)
+            cuentas = {'vuelos': len(vuelos), 'reservas': len(reservas), 'asientos': len(asientos)}
+        else:
+            _copy(cur, 'logs_auditoria', ('id', 'usuario_id', 'accion', 'tabla_afectada', 'registro_id', 'detalles',
+                                          'ip_address', 'fecha_hora'), filas_logs(plan, extra, inicio, fin))
+            cuentas = {'logs_auditoria': fin - inicio}
+        conn.commit()
+        return cuentas
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _bloques(total, tam):
+    return [(i, min(i + tam, total)) for i in range(0, total, tam)]
+
+
+def tareas_vuelos(plan, aerolineas):
+    """Bloques de vuelos con su parte exacta de las reservas y su primer id de reserva"""
+    tareas = []
+    siguiente = plan['bases']['reservas'] + 1
+    asignadas = 0
+    for inicio, fin in _bloques(plan['vuelos'], BLOQUE_VUELOS):
+        hasta = plan['reservas'] * fin // plan['vuelos']
+        cuota = hasta - asignadas
+        tareas.append(('vuelos', plan, aerolineas, inicio, fin, siguiente, cuota))
+        siguiente += cuota
+        asignadas = hasta
+    return tareas
+
+
+def preparar(conn, args):
+    """Vacía (si se pide), crea aerolíneas y usuarios y devuelve el plan"""
+    import bcrypt
+
+    cur = conn.cursor()
+    if args.vaciar:
+        cur.execute('TRUNCATE asientos, reservas, logs_auditoria, vuelos, pasajeros, aerolineas RESTART IDENTITY CASCADE')
+        cur.execute("DELETE FROM usuarios WHERE username <> 'admin'")
+
+    bases = {}
+    for tabla in TABLAS:
+        cur.execute(f'SELECT COALESCE(MAX(id), 0) FROM {tabla}')
+        bases[tabla] = cur.fetchone()[0]
+    plan = calcular_plan(args, bases)
+
+    for codigo, nombre, pais in AEROLINEAS[:args.aerolineas]:
+        cur.execute('''
+            INSERT INTO aerolineas (codigo, nombre, pais_origen, activa) VALUES (%s, %s, %s, TRUE)
+            ON CONFLICT (codigo) DO NOTHING
+        ''', (codigo, nombre, pais))
+    cur.execute('SELECT id, codigo FROM aerolineas WHERE activa ORDER BY id')
+    aerolineas = cur.fetchall()
+
+    rng = _rng(plan, 'usuarios')
+    password_hash = bcrypt.hashpw(args.clave.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    for n in range(plan['usuarios']):
+        usuario_id = bases['usuarios'] + n + 1
+        nombre = f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}'
+        username = f'{_ascii(nombre.split()[0])}.{_ascii(nombre.split()[1])}{usuario_id}'
+        cur.execute('''
+            INSERT INTO usuarios (id, username, password_hash, nombre, email, rol)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', (usuario_id, username, password_hash, nombre, f'{username}@sistema-vuelos.local',
+              rng.choices([r for r, _ in ROLES], [p for _, p in ROLES])[0]))
+    cur.execute('SELECT id, username FROM usuarios ORDER BY id')
+    usuarios = cur.fetchall()
+    if plan['logs']:
+        # COPY no crea particiones: las de los meses de filas_logs, antes de empezar
+        cur.execute("SELECT crear_particiones_logs(%s::date - 365, %s::date)", (plan['hoy'], plan['hoy']))
+    conn.commit()
+    cur.close()
+    return plan, aerolineas, usuarios
+
+
+def finalizar(conn):
+    """Secuencias detrás de los ids cargados y estadísticas del planificador al día"""
+    conn.autocommit = True
+    cur = conn.cursor()
+    for tabla in TABLAS:
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), GREATEST(MAX(id), 1)) FROM {tabla}")
+    cur.execute(f"ANALYZE {', '.join(TABLAS)}, asientos")
+    cur.close()
+
+
+def _ejecutar(pool, tareas, nombre, totales):
+    inicio = time.monotonic()
+    for hechas, cuentas in enumerate(pool.imap_unordered(cargar_bloque, tareas), start=1):
+        for tabla, n in cuentas.items():
+            totales[tabla] = totales.get(tabla, 0) + n
+        print(f"\r  {nombre}: {hechas}/{len(tareas)} bloques", end='', flush=True)
+    if tareas:
+        print(f"  ({time.monotonic() - inicio:.1f}s)")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservas', type=int, default=100000)
+    parser.add_argument('--vuelos', type=int, help=f'por defecto reservas / {RESERVAS_POR_VUELO}')
+    parser.add_argument('--pasajeros', type=int, help='por defecto reservas / 3')
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--logs', type=int, help='por defecto tantos como reservas')
+    parser.add_argument('--aerolineas', type=int, default=len(AEROLINEAS), choices=range(1, len(AEROLINEAS) + 1),
+                        metavar=f'1-{len(AEROLINEAS)}')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--hoy', type=date.fromisoformat, default=date.today(),
+                        help='fecha de referencia (AAAA-MM-DD) para reproducir un conjunto')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--clave', default='clave123', help='contraseña de los usuarios generados')
+    parser.add_argument('--vaciar', action='store_true', help='borra todos los datos (salvo el admin) antes')
+    args = parser.parse_args(argv)
+    if args.vaciar and 'RENDER' in os.environ:
+        print("❌ --vaciar no se puede usar contra la base de datos de Render")
+        return 1
+
+    import psycopg2
+    from conexiones import crear_conexion
+
+    try:
+        conn = crear_conexion()
+    except psycopg2.Error:
+        return 1
+    inicio = time.monotonic()
+    totales = {}
+    try:
+        plan, aerolineas, usuarios = preparar(conn, args)
+        print(f"→ {plan['vuelos']} vuelos, {plan['reservas']} reservas, {plan['pasajeros']} pasajeros, "
+              f"{plan['logs']} logs con {args.procesos} procesos")
+        # fork: los procesos nacen con este módulo ya cargado, sin volver a
+        # ejecutar el script, y con `_conexion` vacía, así que cada uno abre la
+        # suya en _conectar. El plan y las bases viajan en cada tarea.
+        with multiprocessing.get_context('fork').Pool(args.procesos) as pool:
+            _ejecutar(pool, [('pasajeros', plan, None, i, f) for i, f in _bloques(plan['pasajeros'], BLOQUE_PASAJEROS)],
+                      'pasajeros', totales)
+            _ejecutar(pool, tareas_vuelos(plan, aerolineas), 'vuelos, reservas y asientos', totales)
+            _ejecutar(pool, [('logs', plan, usuarios, i, f) for i, f in _bloques(plan['logs'], BLOQUE_LOGS)],
+                      'logs', totales)
+        finalizar(conn)
+    except Exception as e:
+        print(f"\n❌ Error generando datos: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"✅ {time.monotonic() - inicio:.1f}s: " + ', '.join(f'{n} {t}' for t, n in totales.items()))
+    if plan['usuarios']:
+        print(f"   usuarios generados con contraseña '{args.clave}'")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+ESTADÍSTICAS DEL DASHBOARD
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Todos los KPIs en una sola consulta. Los filtros por día usan rangos
+# [inicio, fin) sobre la columna para que puedan usar índices.
+SQL_DASHBOARD = '''
+    SELECT
+        (SELECT COUNT(*) FROM vuelos
+          WHERE fecha_salida >= %(inicio)s AND fecha_salida < %(fin)s) AS vuelos_hoy,
+        (SELECT COUNT(*) FROM reservas
+          WHERE fecha_reserva >= %(inicio)s AND fecha_reserva < %(fin)s) AS reservas_hoy,
+        (SELECT COUNT(*) FROM aerolineas WHERE activa = TRUE) AS aerolineas_activas,
+        (SELECT COUNT(DISTINCT r.pasajero_id) FROM reservas r JOIN vuelos v ON r.vuelo_id = v.id
+          WHERE v.fecha_salida >= %(inicio)s AND v.fecha_salida < %(fin)s) AS pasajeros_hoy,
+        (SELECT COALESCE(json_agg(p ORDER BY p.fecha_salida, p.id), '[]'::json) FROM (
+            SELECT v.id, v.numero_vuelo, v.origen, v.destino, v.fecha_salida, v.estado,
+                   v.asientos_disponibles, v.capacidad,
+                   a.nombre AS aerolinea_nombre, a.codigo AS aerolinea_codigo
+            FROM vuelos v JOIN aerolineas a ON v.aerolinea_id = a.id
+            WHERE v.fecha_salida >= NOW()
+            ORDER BY v.fecha_salida, v.id
+            LIMIT 5
+        ) p) AS proximos_vuelos
+'''
+
+
+def calcular_estadisticas(conn, hoy=None):
+    """Ejecuta la consulta del dashboard y devuelve un diccionario con los KPIs"""
+    hoy = hoy or datetime.now().date()
+    inicio = datetime.combine(hoy, datetime.min.time())
+    cur = conn.cursor()
+    cur.execute(SQL_DASHBOARD, {'inicio': inicio, 'fin': inicio + timedelta(days=1)})
+    vuelos_hoy, reservas_hoy, aerolineas_activas, pasajeros_hoy, proximos = cur.fetchone()
+    cur.close()
+    conn.rollback()
+    for vuelo in proximos:
+        vuelo['fecha_salida'] = datetime.fromisoformat(vuelo['fecha_salida'])
+    return {
+        'hoy': hoy,
+        'vuelos_hoy': vuelos_hoy or 0,
+        'reservas_hoy': reservas_hoy or 0,
+        'aerolineas_activas': aerolineas_activas or 0,
+        'pasajeros_hoy': pasajeros_hoy or 0,
+        'proximos_vuelos': proximos,
+    }
+
+
+class PanelEstadisticas:
+    """Foto de las estadísticas con TTL corto.
+
+    Caducada la foto se sigue sirviendo la anterior mientras un único hilo
+    la recalcula, así varias cargas simultáneas del dashboard no lanzan la
+    consulta a la vez. Solo la primera carga del worker espera a la consulta.
+    """
+
+    def __init__(self, pool, ttl=15.0):
+        self._pool = pool
+        self.ttl = ttl
+        self._foto = None
+        self._calculada = 0.0
+        self._refrescando = False
+        self._lock = threading.Lock()
+        self._carga = threading.Lock()
+
+    def obtener(self):
+        hoy = datetime.now().date()
+        with self._lock:
+            foto = self._foto
+            if foto is not None and foto['hoy'] == hoy:
+                if time.monotonic() - self._calculada >= self.ttl and not self._refrescando:
+                    self._refrescando = True
+                    threading.Thread(target=self._refrescar, name='refresco-dashboard', daemon=True).start()
+                return foto
+        # Sin foto del día: se calcula en línea, una sola petición a la vez
+        with self._carga:
+            with self._lock:
+                if self._foto is not None and self._foto['hoy'] == hoy:
+                    return self._foto
+            return self._recalcular()
+
+    def invalidar(self):
+        with self._lock:
+            self._calculada = 0.0
+
+    def _refrescar(self):
+        try:
+            with self._carga:
+                self._recalcular()
+        except Exception as e:
+            print(f"Error al refrescar dashboard: {e}")
+        finally:
+            with self._lock:
+                self._refrescando = False
+
+    def _recalcular(self):
+        conn = self._pool.obtener()
+        try:
+            foto = calcular_estadisticas(conn)
+        finally:
+            self._pool.devolver(conn)
+        with self._lock:
+            self._foto = foto
+            self._calculada = time.monotonic()
+        return foto
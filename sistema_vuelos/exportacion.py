@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+EXPORTACIÓN EN STREAMING (CSV / NDJSON, COMPRIMIDO CON GZIP)
+"""
+
+import csv
+import io
+import json
+import zlib
+
+# Tamaño aproximado de cada trozo antes de comprimirlo y enviarlo
+TAM_BLOQUE = 64 * 1024
+
+
+def bloques_csv(columnas, filas, tam_bloque=TAM_BLOQUE):
+    """Texto CSV (con cabecera) en trozos de unos `tam_bloque` caracteres"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columnas)
+    for fila in filas:
+        writer.writerow(fila)
+        if buffer.tell() >= tam_bloque:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_valor(valor):
+    """Fechas en ISO 8601 y decimales como texto, para no perder precisión"""
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def bloques_ndjson(columnas, filas, tam_bloque=TAM_BLOQUE):
+    """Un objeto JSON por línea, en trozos de unos `tam_bloque` caracteres"""
+    partes = []
+    tam = 0
+    for fila in filas:
+        linea = json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_json_valor)
+        partes.append(linea)
+        tam += len(linea) + 1
+        if tam >= tam_bloque:
+            partes.append('')
+            yield '\n'.join(partes)
+            partes = []
+            tam = 0
+    if partes:
+        partes.append('')
+        yield '\n'.join(partes)
+
+
+def gzip_stream(bloques, nivel=6):
+    """Comprime al vuelo una secuencia de trozos de texto en formato gzip"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        datos = compresor.compress(bloque.encode('utf-8'))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+FORMATOS = {
+    'csv': bloques_csv,
+    'ndjson': bloques_ndjson,
+}
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+IMPORTACIÓN DE PROGRAMACIÓN DE TEMPORADA
+
+Uso (desde sistema_vuelos/):
+    python horarios.py temporada.csv [--rechazos 50]
+
+Cada línea del CSV es un vuelo recurrente:
+    aerolinea,numero_vuelo,origen,destino,dias,desde,hasta,salida,llegada,capacidad[,llegada_dias]
+    IB,IB6402,MAD,MEX,1.3.5..,2025-04-01,2025-10-31,12:05,17:40,288
+
+`dias` son los días de la semana (1 = lunes ... 7 = domingo) y `aerolinea`
+el código IATA. Si la llegada es anterior a la salida se entiende que es al
+día siguiente, salvo que `llegada_dias` diga otra cosa.
+"""
+
+import csv
+import io
+import sys
+from datetime import date, datetime, time, timedelta
+
+from asientos import SinAsientos, ajustar_asientos, distribucion_asientos, recontar_disponibles
+from importacion import ErrorImportacion, FlujoCSV
+
+COLUMNAS = ('aerolinea', 'numero_vuelo', 'origen', 'destino', 'dias', 'desde', 'hasta',
+            'salida', 'llegada', 'capacidad')
+
+# Una línea no puede generar más de un año y pico de vuelos
+MAX_DIAS = 400
+MAX_RECHAZOS = 1000
+
+
+class _Rechazo(Exception):
+    pass
+
+
+def _dias_semana(texto):
+    """'1.3.5..' / '135' / '1,3,5' -> {1, 3, 5}"""
+    dias = set()
+    for c in texto:
+        if c in '1234567':
+            dias.add(int(c))
+        elif c not in '., -':
+            raise _Rechazo(f'días de la semana no válidos: {texto!r}')
+    if not dias:
+        raise _Rechazo('sin días de operación')
+    return dias
+
+
+def _hora(texto, campo):
+    try:
+        return time.fromisoformat(texto.strip())
+    except ValueError:
+        raise _Rechazo(f'{campo} no es HH:MM') from None
+
+
+def _fecha(texto, campo):
+    try:
+        return date.fromisoformat(texto.strip())
+    except ValueError:
+        raise _Rechazo(f'{campo} no es AAAA-MM-DD') from None
+
+
+def _expandir(linea, fila, aerolineas):
+    """Vuelos concretos de una línea de programación: [linea, numero, aerolinea_id, ...]"""
+    codigo = fila['aerolinea'].strip().upper()
+    aerolinea_id = aerolineas.get(codigo)
+    if aerolinea_id is None:
+        raise _Rechazo(f'aerolínea desconocida o inactiva: {codigo}')
+    numero = fila['numero_vuelo'].strip().upper()
+    origen = fila['origen'].strip().upper()
+    destino = fila['destino'].strip().upper()
+    if not numero or len(numero) > 10:
+        raise _Rechazo('numero_vuelo vacío o de más de 10 caracteres')
+    if not origen or not destino or len(origen) > 100 or len(destino) > 100:
+        raise _Rechazo('origen/destino vacío o demasiado largo')
+    dias = _dias_semana(fila['dias'])
+    desde, hasta = _fecha(fila['desde'], 'desde'), _fecha(fila['hasta'], 'hasta')
+    if hasta < desde or (hasta - desde).days > MAX_DIAS:
+        raise _Rechazo(f'rango de fechas no válido (máximo {MAX_DIAS} días)')
+    salida, llegada = _hora(fila['salida'], 'salida'), _hora(fila['llegada'], 'llegada')
+    try:
+        capacidad = int(fila['capacidad'])
+        extra = fila.get('llegada_dias')
+        llegada_dias = int(extra) if extra and extra.strip() else (1 if llegada < salida else 0)
+    except ValueError:
+        raise _Rechazo('capacidad o llegada_dias no es un número') from None
+    if capacidad <= 0:
+        raise _Rechazo('capacidad debe ser mayor que 0')
+    if llegada_dias < 0:
+        raise _Rechazo('llegada_dias no puede ser negativo')
+    # La duración no depende del día (horas locales sin zona), basta mirarla una vez
+    if datetime.combine(desde + timedelta(days=llegada_dias), llegada) <= datetime.combine(desde, salida):
+        raise _Rechazo('la llegada no es posterior a la salida')
+
+    dia = desde
+    while dia <= hasta:
+        if dia.isoweekday() in dias:
+            fecha_salida = datetime.combine(dia, salida)
+            fecha_llegada = datetime.combine(dia + timedelta(days=llegada_dias), llegada)
+            yield [linea, numero, aerolinea_id, origen, destino, fecha_salida, fecha_llegada, capacidad]
+        dia += timedelta(days=1)
+
+
+def _lineas_csv(flujo):
+    """(número de línea, dict) de un CSV con cabecera, separado por comas o punto y coma"""
+    texto = io.TextIOWrapper(flujo, encoding='utf-8-sig', errors='replace', newline='')
+    cabecera = texto.readline()
+    if not cabecera.strip():
+        raise ErrorImportacion('El archivo está vacío')
+    delimitador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+    nombres = [n.strip().lower() for n in next(csv.reader([cabecera], delimiter=delimitador))]
+    faltan = [c for c in COLUMNAS if c not in nombres]
+    if faltan:
+        raise ErrorImportacion(f'Faltan columnas obligatorias: {", ".join(faltan)}')
+    lector = csv.reader(texto, delimiter=delimitador)
+    # Línea donde empieza cada registro, contando la cabecera y los saltos de
+    # línea dentro de campos entre comillas
+    siguiente = 2
+    for valores in lector:
+        numero, siguiente = siguiente, lector.line_num + 2
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(nombres, valores))
+
+
+def importar_horarios(conn, flujo, max_rechazos=MAX_RECHAZOS):
+    """Expande una programación recurrente en vuelos y los da de alta o actualiza.
+
+    Los vuelos generados van por COPY a una tabla temporal a medida que se
+    leen las líneas; de ahí un único upsert por (numero_vuelo, fecha_salida),
+    así reimportar el mismo archivo no duplica nada. A los vuelos nuevos se
+    les crean los asientos también con COPY. Todo en una transacción.
+    """
+    cur = conn.cursor()
+    rechazos = []
+    contador = {'lineas': 0, 'rechazadas': 0}
+
+    def generar():
+        for numero, fila in _lineas_csv(flujo):
+            contador['lineas'] += 1
+            try:
+                # Se expande la línea entera antes de emitirla: si falla a
+                # medias no deja vuelos sueltos
+                vuelos = list(_expandir(numero, fila, aerolineas))
+            except (_Rechazo, KeyError, TypeError) as e:
+                contador['rechazadas'] += 1
+                if len(rechazos) < max_rechazos:
+                    motivo = str(e) if isinstance(e, _Rechazo) else 'faltan valores en la línea'
+                    rechazos.append((numero, (fila.get('numero_vuelo') or '').strip(), motivo))
+                continue
+            yield from vuelos
+
+    try:
+        cur.execute('SELECT upper(codigo), id FROM aerolineas WHERE activa = TRUE')
+        aerolineas = dict(cur.fetchall())
+
+        cur.execute('''
+            CREATE TEMP TABLE vuelos_importacion (
+                linea INTEGER,
+                numero_vuelo VARCHAR(10),
+                aerolinea_id INTEGER,
+                origen VARCHAR(100),
+                destino VARCHAR(100),
+                fecha_salida TIMESTAMP,
+                fecha_llegada TIMESTAMP,
+                capacidad INTEGER
+            ) ON COMMIT DROP
+        ''')
+        cur.copy_expert('COPY vuelos_importacion FROM STDIN WITH (FORMAT csv)', FlujoCSV(generar()), size=1 << 16)
+
+        # Si dos líneas generan el mismo vuelo vale la última
+        cur.execute('''
+            WITH filas AS (
+                INSERT INTO vuelos (numero_vuelo, aerolinea_id, origen, destino, fecha_salida, fecha_llegada,
+                                    capacidad, asientos_disponibles)
+                SELECT DISTINCT ON (numero_vuelo, fecha_salida)
+                       numero_vuelo, aerolinea_id, origen, destino, fecha_salida, fecha_llegada, capacidad, capacidad
+                FROM vuelos_importacion
+                ORDER BY numero_vuelo, fecha_salida, linea DESC
+                ON CONFLICT (numero_vuelo, fecha_salida) DO UPDATE SET
+                    aerolinea_id = EXCLUDED.aerolinea_id,
+                    origen = EXCLUDED.origen,
+                    destino = EXCLUDED.destino,
+                    fecha_llegada = EXCLUDED.fecha_llegada,
+                    capacidad = EXCLUDED.capacidad,
+                    asientos_disponibles = LEAST(vuelos.asientos_disponibles, EXCLUDED.capacidad)
+                WHERE (vuelos.aerolinea_id, vuelos.origen, vuelos.destino, vuelos.fecha_llegada, vuelos.capacidad)
+                      IS DISTINCT FROM (EXCLUDED.aerolinea_id, EXCLUDED.origen, EXCLUDED.destino,
+                                        EXCLUDED.fecha_llegada, EXCLUDED.capacidad)
+                RETURNING id, capacidad, (xmax = 0) AS insertado
+            )
+            SELECT id, capacidad, insertado FROM filas
+        ''')
+        cambios = cur.fetchall()
+        nuevos = [(vuelo_id, capacidad) for vuelo_id, capacidad, insertado in cambios if insertado]
+        actualizados = [(vuelo_id, capacidad) for vuelo_id, capacidad, insertado in cambios if not insertado]
+
+        distribuciones = {}
+
+        def filas_asientos():
+            for vuelo_id, capacidad in nuevos:
+                if capacidad not in distribuciones:
+                    distribuciones[capacidad] = distribucion_asientos(capacidad)
+                for asiento, clase, fila in distribuciones[capacidad]:
+                    yield vuelo_id, asiento, clase, fila
+
+        if nuevos:
+            cur.copy_expert('COPY asientos (vuelo_id, asiento, clase, fila) FROM STDIN WITH (FORMAT csv)',
+                            FlujoCSV(filas_asientos()), size=1 << 16)
+        for vuelo_id, capacidad in actualizados:
+            try:
+                ajustar_asientos(cur, vuelo_id, capacidad)
+            except SinAsientos as e:
+                raise ErrorImportacion(f'Vuelo {vuelo_id}: {e}') from None
+        if actualizados:
+            recontar_disponibles(cur, [vuelo_id for vuelo_id, _ in actualizados])
+
+        cur.execute('SELECT COUNT(*), COUNT(DISTINCT (numero_vuelo, fecha_salida)) FROM vuelos_importacion')
+        generados, distintos = cur.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'lineas': contador['lineas'],
+        'vuelos_generados': generados,
+        'insertados': len(nuevos),
+        'actualizados': len(actualizados),
+        'sin_cambios': distintos - len(cambios),
+        'ids_actualizados': [vuelo_id for vuelo_id, _ in actualizados],
+        'rechazadas': contador['rechazadas'],
+        'rechazos': rechazos,
+    }
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    import argparse
+    import time as reloj
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo')
+    parser.add_argument('--rechazos', type=int, default=20, help='rechazos a mostrar')
+    args = parser.parse_args(argv)
+
+    from conexiones import crear_conexion
+
+    conn = crear_conexion()
+    inicio = reloj.monotonic()
+    try:
+        with open(args.archivo, 'rb') as flujo:
+            r = importar_horarios(conn, flujo)
+    except ErrorImportacion as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    segundos = reloj.monotonic() - inicio
+
+    print(f"✅ {r['lineas']} líneas -> {r['vuelos_generados']} vuelos en {segundos:.1f}s")
+    print(f"   nuevos: {r['insertados']}  actualizados: {r['actualizados']}  "
+          f"sin cambios: {r['sin_cambios']}  líneas rechazadas: {r['rechazadas']}")
+    for linea, numero, motivo in r['rechazos'][:args.rechazos]:
+        print(f"   línea {linea}: {numero or '-'}: {motivo}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+IMPORTACIÓN MASIVA DE PASAJEROS
+
+Uso (desde sistema_vuelos/):
+    python importacion.py manifiesto.csv
+    python importacion.py manifiesto.ndjson [--formato ndjson] [--rechazos 50]
+
+El archivo se lee fila a fila y se envía a PostgreSQL con COPY a una tabla
+temporal sin cargarlo entero en memoria; la validación y el alta/actualización
+por pasaporte se hacen en SQL.
+"""
+
+import csv
+import io
+import json
+import sys
+
+import psycopg2
+
+# Columnas que se aceptan y su longitud máxima en la tabla pasajeros
+COLUMNAS = {
+    'pasaporte': 50,
+    'nombre': 100,
+    'apellido': 100,
+    'nacionalidad': 100,
+    'fecha_nacimiento': None,
+    'telefono': 20,
+    'email': 100,
+}
+OBLIGATORIAS = ('pasaporte', 'nombre', 'apellido')
+
+# Rechazos que se devuelven con su línea y motivo (se cuentan todos)
+MAX_RECHAZOS = 1000
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (cabecera, formato o estructura)"""
+
+
+# ==================== LECTURA DEL ARCHIVO ====================
+
+def _cabecera_csv(flujo):
+    """Lee la primera línea y devuelve (columnas, delimitador)"""
+    linea = flujo.readline()
+    if not linea:
+        raise ErrorImportacion('El archivo está vacío')
+    texto = linea.decode('utf-8-sig').rstrip('\r\n')
+    delimitador = ';' if texto.count(';') > texto.count(',') else ','
+    nombres = [n.strip().lower() for n in next(csv.reader([texto], delimiter=delimitador))]
+    faltan = [c for c in OBLIGATORIAS if c not in nombres]
+    if faltan:
+        raise ErrorImportacion(f'Faltan columnas obligatorias: {", ".join(faltan)}')
+    repetidas = {n for n in nombres if nombres.count(n) > 1 and n in COLUMNAS}
+    if repetidas:
+        raise ErrorImportacion(f'Columnas repetidas: {", ".join(sorted(repetidas))}')
+    return nombres, delimitador
+
+
+def _filas_csv(flujo, cabecera, delimitador, errores):
+    """Filas para COPY a partir del CSV (lo que queda tras la cabecera).
+
+    Las columnas desconocidas se ignoran. Las filas con un número de columnas
+    distinto del de la cabecera se pasan con su motivo para que aparezcan
+    entre los rechazos. Un error del módulo csv corta la lectura y se deja en
+    `errores`: una excepción dentro del COPY no llegaría tal cual.
+    """
+    lector = csv.reader(io.TextIOWrapper(flujo, encoding='utf-8', errors='replace', newline=''),
+                        delimiter=delimitador)
+    posiciones = [cabecera.index(c) if c in cabecera else None for c in COLUMNAS]
+    # Línea donde empieza cada fila, contando la cabecera y los saltos de
+    # línea dentro de campos entre comillas
+    siguiente = 2
+    try:
+        for valores in lector:
+            numero, siguiente = siguiente, lector.line_num + 2
+            if not valores:
+                continue
+            fila = [numero]
+            for p in posiciones:
+                fila.append(valores[p] if p is not None and p < len(valores) else '')
+            if len(valores) != len(cabecera):
+                fila.append(f'tiene {len(valores)} columnas y la cabecera {len(cabecera)}')
+            else:
+                fila.append('')
+            yield fila
+    except csv.Error as e:
+        errores.append(f'Archivo mal formado: {e} (línea {siguiente})')
+
+
+class FlujoCSV:
+    """Objeto tipo archivo que COPY lee por bloques, generado a partir de filas.
+
+    Las filas (listas de valores) se van pidiendo al iterable según COPY lee,
+    así nunca hay más de un bloque en memoria.
+    """
+
+    def __init__(self, filas):
+        self._filas = iter(filas)
+        self._pendiente = b''
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+
+    def _siguiente_bloque(self, minimo):
+        for fila in self._filas:
+            self._writer.writerow(fila)
+            if self._buffer.tell() >= minimo:
+                break
+        datos = self._buffer.getvalue().encode('utf-8')
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return datos
+
+    def read(self, size=65536):
+        size = size if size and size > 0 else 65536
+        while len(self._pendiente) < size:
+            bloque = self._siguiente_bloque(size)
+            if not bloque:
+                break
+            self._pendiente += bloque
+        datos, self._pendiente = self._pendiente[:size], self._pendiente[size:]
+        return datos
+
+
+# Columnas de la tabla de staging, en el orden en que se envían por COPY
+CAMPOS_STAGING = ['linea', *COLUMNAS, 'motivo']
+
+
+def _filas_ndjson(flujo):
+    """Filas para COPY a partir de NDJSON; las líneas que no son un objeto JSON
+    se pasan con su motivo para que aparezcan entre los rechazos"""
+    for numero, linea in enumerate(flujo, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            dato = json.loads(linea)
+        except ValueError:
+            dato = None
+        if isinstance(dato, dict):
+            fila = [numero]
+            for c in COLUMNAS:
+                valor = dato.get(c)
+                fila.append('' if valor is None else str(valor))
+            fila.append('')
+        else:
+            fila = [numero, *([''] * len(COLUMNAS)), 'no es un objeto JSON válido']
+        yield fila
+
+
+# ==================== CARGA Y UPSERT ====================
+
+def _sql_motivo():
+    """Expresión CASE con el primer motivo de rechazo de cada fila de staging"""
+    casos = [f"WHEN NULLIF(trim({c}), '') IS NULL THEN 'falta {c}'" for c in OBLIGATORIAS]
+    casos += [f"WHEN length(trim({c})) > {n} THEN '{c} supera {n} caracteres'"
+              for c, n in COLUMNAS.items() if n]
+    # Fecha AAAA-MM-DD comprobada antes de convertir, para que una fecha
+    # imposible no aborte toda la carga (los CASE anidados fijan el orden de
+    # evaluación). El año 0000 no existe en PostgreSQL: el ::date fallaría.
+    casos.append(r'''
+        WHEN NULLIF(trim(fecha_nacimiento), '') IS NOT NULL AND NOT (CASE
+            WHEN trim(fecha_nacimiento) !~ '^(?!0000)\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$' THEN FALSE
+            ELSE substr(trim(fecha_nacimiento), 9, 2)::int <= extract(day FROM
+                 (substr(trim(fecha_nacimiento), 1, 7) || '-01')::date + INTERVAL '1 month' - INTERVAL '1 day')
+        END) THEN 'fecha_nacimiento no es AAAA-MM-DD'
+    ''')
+    return 'CASE ' + '\n'.join(casos) + ' END'
+
+
+def _error_copy(e):
+    """Mensaje de un COPY fallido"""
+    return f'Archivo mal formado: {e.diag.message_primary or str(e).strip()}'
+
+
+def _valor(c):
+    if c == 'fecha_nacimiento':
+        return "NULLIF(trim(s.fecha_nacimiento), '')::date"
+    return f"NULLIF(trim(s.{c}), '')"
+
+
+def importar_pasajeros(conn, flujo, formato='csv', max_rechazos=MAX_RECHAZOS):
+    """Importa pasajeros desde un archivo binario abierto (CSV con cabecera o NDJSON).
+
+    Alta de los pasaportes nuevos y actualización de los existentes; si un
+    pasaporte se repite en el archivo vale la última línea. Todo va en una
+    transacción: o se importa el archivo entero (salvo los rechazos) o nada.
+    Devuelve un diccionario con los totales y los primeros rechazos.
+    """
+    cur = conn.cursor()
+    errores = []
+    try:
+        if formato == 'ndjson':
+            filas = _filas_ndjson(io.TextIOWrapper(flujo, encoding='utf-8-sig', errors='replace'))
+        elif formato == 'csv':
+            cabecera, delimitador = _cabecera_csv(flujo)
+            filas = _filas_csv(flujo, cabecera, delimitador, errores)
+        else:
+            raise ErrorImportacion(f'Formato desconocido: {formato}')
+
+        cur.execute(f'''
+            CREATE TEMP TABLE pasajeros_importacion (
+                linea BIGINT,
+                {', '.join(f'{c} TEXT' for c in COLUMNAS)},
+                motivo TEXT
+            ) ON COMMIT DROP
+        ''')
+        try:
+            cur.copy_expert(f"COPY pasajeros_importacion ({', '.join(CAMPOS_STAGING)}) FROM STDIN "
+                            "WITH (FORMAT csv, ENCODING 'UTF8')", FlujoCSV(filas), size=1 << 16)
+        except psycopg2.DataError as e:
+            raise ErrorImportacion(_error_copy(e)) from None
+        if errores:
+            raise ErrorImportacion(errores[0])
+
+        cur.execute(f'UPDATE pasajeros_importacion SET motivo = {_sql_motivo()} WHERE motivo IS NULL')
+        cur.execute('''
+            UPDATE pasajeros_importacion s SET motivo = 'pasaporte repetido; se usa la línea ' || u.ultima
+            FROM (
+                SELECT trim(pasaporte) AS pasaporte, MAX(linea) AS ultima
+                FROM pasajeros_importacion WHERE motivo IS NULL
+                GROUP BY trim(pasaporte) HAVING COUNT(*) > 1
+            ) u
+            WHERE s.motivo IS NULL AND trim(s.pasaporte) = u.pasaporte AND s.linea < u.ultima
+        ''')
+
+        resto = [c for c in COLUMNAS if c != 'pasaporte']
+        cur.execute(f'''
+            WITH filas AS (
+                INSERT INTO pasajeros ({', '.join(COLUMNAS)})
+                SELECT {', '.join(_valor(c) for c in COLUMNAS)}
+                FROM pasajeros_importacion s
+                WHERE s.motivo IS NULL
+                ORDER BY s.linea
+                ON CONFLICT (pasaporte) DO UPDATE SET
+                    {', '.join(f'{c} = EXCLUDED.{c}' for c in resto)}
+                WHERE ({', '.join(f'pasajeros.{c}' for c in resto)})
+                      IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in resto)})
+                RETURNING (xmax = 0) AS insertado
+            )
+            SELECT COUNT(*) FILTER (WHERE insertado), COUNT(*) FILTER (WHERE NOT insertado) FROM filas
+        ''')
+        insertadas, actualizadas = cur.fetchone()
+
+        cur.execute('SELECT COUNT(*), COUNT(*) FILTER (WHERE motivo IS NOT NULL) FROM pasajeros_importacion')
+        leidas, rechazadas = cur.fetchone()
+        cur.execute('''
+            SELECT linea, trim(pasaporte), motivo FROM pasajeros_importacion
+            WHERE motivo IS NOT NULL ORDER BY linea LIMIT %s
+        ''', (max_rechazos,))
+        rechazos = cur.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'leidas': leidas,
+        'insertadas': insertadas,
+        'actualizadas': actualizadas,
+        'sin_cambios': leidas - rechazadas - insertadas - actualizadas,
+        'rechazadas': rechazadas,
+        'rechazos': rechazos,
+    }
+
+
+def formato_de(nombre_archivo, formato=None):
+    """Formato pedido o, si no, deducido de la extensión"""
+    if formato:
+        return formato
+    return 'ndjson' if nombre_archivo.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo')
+    parser.add_argument('--formato', choices=['csv', 'ndjson'])
+    parser.add_argument('--rechazos', type=int, default=20, help='rechazos a mostrar')
+    args = parser.parse_args(argv)
+
+    from conexiones import crear_conexion
+
+    conn = crear_conexion()
+    inicio = time.monotonic()
+    try:
+        with open(args.archivo, 'rb') as flujo:
+            r = importar_pasajeros(conn, flujo, formato_de(args.archivo, args.formato))
+    except ErrorImportacion as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    segundos = time.monotonic() - inicio
+
+    print(f"✅ {r['leidas']} filas en {segundos:.1f}s ({r['leidas'] / max(segundos, 1e-6):,.0f} filas/s)")
+    print(f"   nuevas: {r['insertadas']}  actualizadas: {r['actualizadas']}  "
+          f"sin cambios: {r['sin_cambios']}  rechazadas: {r['rechazadas']}")
+    for linea, pasaporte, motivo in r['rechazos'][:args.rechazos]:
+        print(f"   línea {linea}: {pasaporte or '-'}: {motivo}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
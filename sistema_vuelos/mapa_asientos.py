@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+MAPA DE ASIENTOS EN MEMORIA Y ASIGNACIÓN AUTOMÁTICA
+"""
+
+import threading
+
+from asientos import LETRAS, SinAsientos, distribucion_asientos
+from cache import CacheTTL
+
+POR_FILA = len(LETRAS)
+
+# Preferencia al elegir un asiento suelto: ventanilla, pasillo y centro
+TIPOS = (('ventanilla', 'AF'), ('pasillo', 'CD'), ('centro', 'BE'))
+
+
+def _mascara(indices):
+    m = 0
+    for i in indices:
+        m |= 1 << i
+    return m
+
+
+def _bits(x):
+    while x:
+        bajo = x & -x
+        yield bajo.bit_length() - 1
+        x ^= bajo
+
+
+class MapaAsientos:
+    """Ocupación de un vuelo como enteros usados de bitmap.
+
+    El bit i es el asiento i de distribucion_asientos() (fila a fila, A-F).
+    Cada clase y cada tipo de asiento tiene su máscara, así que buscar el
+    mejor asiento libre o N contiguos son unas pocas operaciones de bits.
+    """
+
+    def __init__(self, capacidad, ocupados=()):
+        self.capacidad = capacidad
+        self.nombres = []
+        self._indices = {}
+        por_clase = {}
+        for i, (asiento, clase, _) in enumerate(distribucion_asientos(capacidad)):
+            self.nombres.append(asiento)
+            self._indices[asiento] = i
+            por_clase.setdefault(clase, []).append(i)
+        self.todos = (1 << capacidad) - 1
+        self.clases = {clase: _mascara(indices) for clase, indices in por_clase.items()}
+        self.tipos = [_mascara(i for i in range(capacidad) if LETRAS[i % POR_FILA] in letras)
+                      for _, letras in TIPOS]
+        # Posiciones donde puede empezar un grupo de n sin salirse de la fila
+        # (fila) o sin cruzar el pasillo (bloque de 3)
+        self._inicio_fila = {}
+        self._inicio_bloque = {}
+        for n in range(1, POR_FILA + 1):
+            self._inicio_fila[n] = _mascara(i for i in range(capacidad) if i % POR_FILA + n <= POR_FILA)
+            self._inicio_bloque[n] = _mascara(
+                i for i in range(capacidad) if (i % POR_FILA) // 3 == (i % POR_FILA + n - 1) // 3)
+        self.ocupados = 0
+        self._lock = threading.Lock()
+        for asiento in ocupados:
+            self._marcar(asiento, True)
+
+    def _marcar(self, asiento, ocupado):
+        i = self._indices.get(asiento)
+        if i is None:
+            return
+        if ocupado:
+            self.ocupados |= 1 << i
+        else:
+            self.ocupados &= ~(1 << i)
+
+    def ocupar(self, *asientos):
+        with self._lock:
+            for asiento in asientos:
+                self._marcar(asiento, True)
+
+    def liberar(self, *asientos):
+        with self._lock:
+            for asiento in asientos:
+                self._marcar(asiento, False)
+
+    def _libres(self, clase):
+        mascara = self.clases.get(clase, 0) if clase else self.todos
+        return mascara & ~self.ocupados
+
+    def libres(self, clase=None):
+        return self._libres(clase).bit_count()
+
+    def asignar(self, clase=None):
+        """Reserva en el mapa el mejor asiento libre de la clase y lo devuelve.
+
+        Ventanilla antes que pasillo y pasillo antes que centro; dentro de
+        cada tipo, la fila más adelantada. None si la clase está llena.
+        """
+        with self._lock:
+            libres = self._libres(clase)
+            for tipo in self.tipos:
+                x = libres & tipo
+                if x:
+                    i = (x & -x).bit_length() - 1
+                    self.ocupados |= 1 << i
+                    return self.nombres[i]
+            return None
+
+    def asignar_grupo(self, clase, n):
+        """Reserva en el mapa n asientos para un grupo, lo más juntos posible.
+
+        Primero n contiguos en el mismo lado del pasillo, luego en la misma
+        fila y, si no caben, los n primeros libres por orden de fila. Devuelve
+        la lista de asientos o None si no hay n libres en la clase.
+        """
+        if n == 1:
+            asiento = self.asignar(clase)
+            return [asiento] if asiento else None
+        with self._lock:
+            libres = self._libres(clase)
+            if libres.bit_count() < n:
+                return None
+            elegidos = None
+            if n <= POR_FILA:
+                # Bits donde empieza una racha de n libres
+                racha = libres
+                for k in range(1, n):
+                    racha &= libres >> k
+                for inicios in (self._inicio_bloque[n], self._inicio_fila[n]):
+                    x = racha & inicios
+                    if x:
+                        i = (x & -x).bit_length() - 1
+                        elegidos = list(range(i, i + n))
+                        break
+            if elegidos is None:
+                elegidos = []
+                for i in _bits(libres):
+                    elegidos.append(i)
+                    if len(elegidos) == n:
+                        break
+            for i in elegidos:
+                self.ocupados |= 1 << i
+            return [self.nombres[i] for i in elegidos]
+
+
+class MapasAsientos:
+    """Mapas por vuelo cacheados en memoria; en un fallo se rehacen desde `asientos`.
+
+    El mapa solo propone asientos: la tabla de asientos manda y cada propuesta
+    se confirma con FOR UPDATE SKIP LOCKED. Si otra petición u otro worker se
+    adelantó, el mapa se corrige y se vuelve a proponer.
+    """
+
+    def __init__(self, ttl=60.0, maximo=512, intentos=3):
+        self._cache = CacheTTL(ttl=ttl, maximo=maximo)
+        self.intentos = intentos
+
+    def obtener(self, cur, vuelo_id):
+        mapa = self._cache.obtener(vuelo_id)
+        if mapa is None:
+            cur.execute('SELECT capacidad FROM vuelos WHERE id = %s', (vuelo_id,))
+            fila = cur.fetchone()
+            if fila is None:
+                raise SinAsientos('El vuelo no existe')
+            cur.execute('SELECT asiento FROM asientos WHERE vuelo_id = %s AND reserva_id IS NOT NULL', (vuelo_id,))
+            mapa = MapaAsientos(fila[0], (f[0] for f in cur.fetchall()))
+            self._cache.guardar(vuelo_id, mapa)
+        return mapa
+
+    def invalidar(self, vuelo_id):
+        self._cache.invalidar(vuelo_id)
+
+    def ocupar(self, vuelo_id, *asientos):
+        mapa = self._cache.obtener(vuelo_id)
+        if mapa is not None:
+            mapa.ocupar(*asientos)
+
+    def liberar(self, vuelo_id, *asientos):
+        mapa = self._cache.obtener(vuelo_id)
+        if mapa is not None:
+            mapa.liberar(*asientos)
+
+    def asignar(self, cur, vuelo_id, clase, n=1):
+        """Elige y bloquea n asientos libres dentro de la transacción en curso.
+
+        Cada intento va en un SAVEPOINT: si alguno de los asientos propuestos
+        ya no está libre se deshace el intento (soltando los bloqueos que sí
+        se tomaron) y se prueba con el mapa corregido.
+        """
+        for intento in range(self.intentos):
+            if intento == self.intentos - 1:
+                # Último intento con el mapa recién leído de la base de datos
+                self.invalidar(vuelo_id)
+            mapa = self.obtener(cur, vuelo_id)
+            elegidos = mapa.asignar_grupo(clase, n)
+            if not elegidos:
+                raise SinAsientos(f'No quedan {n} asientos libres en esa clase' if n > 1
+                                  else 'No quedan asientos libres en esa clase')
+            cur.execute('SAVEPOINT asignar_asientos')
+            cur.execute('''
+                SELECT asiento FROM asientos
+                WHERE vuelo_id = %s AND asiento = ANY(%s) AND reserva_id IS NULL
+                FOR UPDATE SKIP LOCKED
+            ''', (vuelo_id, elegidos))
+            tomados = {f[0] for f in cur.fetchall()}
+            if len(tomados) == len(elegidos):
+                cur.execute('RELEASE SAVEPOINT asignar_asientos')
+                return elegidos
+            cur.execute('ROLLBACK TO SAVEPOINT asignar_asientos')
+            # Los que no se pudieron tomar siguen marcados; el resto se devuelve
+            mapa.liberar(*tomados)
+        raise SinAsientos('Los asientos se están reservando a la vez; inténtalo de nuevo')
+
+    def estadisticas(self):
+        return self._cache.estadisticas()
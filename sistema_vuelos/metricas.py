@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+MÉTRICAS EN FORMATO PROMETHEUS, AGREGADAS ENTRE WORKERS
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Clave del environ WSGI con los datos de la petición en curso
+CLAVE_PETICION = 'sistema_vuelos.metricas'
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+BUCKETS_BYTES = (1000, 10000, 100000, 1000000, 10000000)
+
+ACUMULADO = 'acumulado.json'
+
+
+def _clave(etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _etiquetas_texto(etiquetas, extra=None):
+    pares = list(etiquetas) + (list(extra) if extra else [])
+    if not pares:
+        return ''
+    escapar = lambda v: v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in pares) + '}'
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metricas:
+    """Contadores, histogramas y gauges por proceso, volcados a un directorio común.
+
+    Cada worker guarda sus valores en memoria y cada `intervalo` segundos los
+    escribe en su propio archivo de `directorio`. `exportar()` suma los
+    archivos de todos los workers; los de workers que ya no existen se pasan
+    a un acumulado para que los contadores nunca bajen. Los gauges solo se
+    suman de los workers vivos.
+    """
+
+    def __init__(self, directorio, intervalo=5.0, prefijo='sistema_vuelos'):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.prefijo = prefijo
+        self._definiciones = {}
+        self._medidores = []
+        os.makedirs(directorio, exist_ok=True)
+        self._iniciar_estado()
+        atexit.register(self.detener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        # Lo que midió el padre antes del fork es del padre
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self._hilo = None
+        self._pid = os.getpid()
+        self._archivo = os.path.join(self.directorio, f'{self._pid}_{time.time_ns()}.json')
+        self._parar = threading.Event()
+
+    # ---------- definición y registro ----------
+
+    def definir(self, nombre, tipo, ayuda, buckets=None):
+        self._definiciones[nombre] = (tipo, ayuda, tuple(buckets) if buckets else None)
+
+    def medidor(self, funcion):
+        """Registra una función que devuelve [(nombre, etiquetas, valor)] de gauges"""
+        self._medidores.append(funcion)
+
+    def contar(self, nombre, valor=1, **etiquetas):
+        self._asegurar_hilo()
+        clave = (nombre, _clave(etiquetas))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        self._asegurar_hilo()
+        buckets = self._definiciones[nombre][2]
+        clave = (nombre, _clave(etiquetas))
+        with self._lock:
+            h = self._histogramas.get(clave)
+            if h is None:
+                h = self._histogramas[clave] = [[0] * (len(buckets) + 1), 0.0, 0]
+            h[0][bisect_left(buckets, valor)] += 1
+            h[1] += valor
+            h[2] += 1
+
+    # ---------- volcado a disco ----------
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._bucle, name='metricas', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.volcar()
+
+    def _foto(self):
+        with self._lock:
+            contadores = [[n, list(e), v] for (n, e), v in self._contadores.items()]
+            histogramas = [[n, list(e), list(h[0]), h[1], h[2]] for (n, e), h in self._histogramas.items()]
+        gauges = []
+        for funcion in self._medidores:
+            try:
+                gauges.extend([n, list(_clave(e)), v] for n, e, v in funcion())
+            except Exception as e:
+                print(f"Error leyendo métricas: {e}")
+        return {'pid': self._pid, 'contadores': contadores, 'histogramas': histogramas, 'gauges': gauges}
+
+    def volcar(self):
+        """Escribe el archivo de este worker (de forma atómica)"""
+        try:
+            temporal = self._archivo + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._foto(), f)
+            os.replace(temporal, self._archivo)
+        except OSError as e:
+            print(f"Error volcando métricas: {e}")
+
+    def detener(self):
+        self._parar.set()
+        if self._pid == os.getpid():
+            self.volcar()
+
+    # ---------- agregación y exposición ----------
+
+    def _sumar(self, total, foto, con_gauges=True):
+        for n, e, v in foto.get('contadores', ()):
+            clave = (n, tuple(map(tuple, e)))
+            total['contadores'][clave] = total['contadores'].get(clave, 0) + v
+        for n, e, buckets, suma, cuenta in foto.get('histogramas', ()):
+            clave = (n, tuple(map(tuple, e)))
+            h = total['histogramas'].get(clave)
+            if h is None or len(h[0]) != len(buckets):
+                h = total['histogramas'][clave] = [[0] * len(buckets), 0.0, 0]
+            for i, c in enumerate(buckets):
+                h[0][i] += c
+            h[1] += suma
+            h[2] += cuenta
+        if con_gauges:
+            for n, e, v in foto.get('gauges', ()):
+                clave = (n, tuple(map(tuple, e)))
+                total['gauges'][clave] = total['gauges'].get(clave, 0) + v
+
+    @staticmethod
+    def _a_foto(total):
+        return {
+            'contadores': [[n, list(e), v] for (n, e), v in total['contadores'].items()],
+            'histogramas': [[n, list(e), h[0], h[1], h[2]] for (n, e), h in total['histogramas'].items()],
+        }
+
+    def agregar(self):
+        """Suma de todos los workers; pasa al acumulado los archivos de workers muertos"""
+        self.volcar()
+        total = {'contadores': {}, 'histogramas': {}, 'gauges': {}}
+        with open(os.path.join(self.directorio, '.lock'), 'w') as cerrojo:
+            fcntl.flock(cerrojo, fcntl.LOCK_EX)
+            ruta_acumulado = os.path.join(self.directorio, ACUMULADO)
+            acumulado = {'contadores': {}, 'histogramas': {}, 'gauges': {}}
+            try:
+                with open(ruta_acumulado, encoding='utf-8') as f:
+                    self._sumar(acumulado, json.load(f), con_gauges=False)
+            except (OSError, ValueError):
+                pass
+            muertos = []
+            for nombre in os.listdir(self.directorio):
+                if not nombre.endswith('.json') or nombre == ACUMULADO:
+                    continue
+                ruta = os.path.join(self.directorio, nombre)
+                try:
+                    with open(ruta, encoding='utf-8') as f:
+                        foto = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if _vivo(foto.get('pid', 0)):
+                    self._sumar(total, foto)
+                else:
+                    self._sumar(acumulado, foto, con_gauges=False)
+                    muertos.append(ruta)
+            if muertos:
+                temporal = ruta_acumulado + '.tmp'
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(self._a_foto(acumulado), f)
+                os.replace(temporal, ruta_acumulado)
+                for ruta in muertos:
+                    os.remove(ruta)
+        self._sumar(total, self._a_foto(acumulado), con_gauges=False)
+        return total
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)"""
+        total = self.agregar()
+        series = {}
+        for tipo_serie in ('contadores', 'histogramas', 'gauges'):
+            for (nombre, etiquetas), valor in total[tipo_serie].items():
+                series.setdefault(nombre, []).append((etiquetas, valor))
+        lineas = []
+        for nombre in sorted(series):
+            tipo, ayuda, buckets = self._definiciones.get(nombre, ('untyped', '', None))
+            completo = f'{self.prefijo}_{nombre}'
+            lineas.append(f'# HELP {completo} {ayuda}')
+            lineas.append(f'# TYPE {completo} {tipo}')
+            for etiquetas, valor in sorted(series[nombre]):
+                if tipo == 'histogram':
+                    cuentas, suma, n = valor
+                    acumulada = 0
+                    limites = [str(b) for b in buckets] + ['+Inf']
+                    for limite, c in zip(limites, cuentas):
+                        acumulada += c
+                        lineas.append(f'{completo}_bucket{_etiquetas_texto(etiquetas, [("le", limite)])} {acumulada}')
+                    lineas.append(f'{completo}_sum{_etiquetas_texto(etiquetas)} {suma}')
+                    lineas.append(f'{completo}_count{_etiquetas_texto(etiquetas)} {n}')
+                else:
+                    lineas.append(f'{completo}{_etiquetas_texto(etiquetas)} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+class _CuerpoMedido:
+    """Iterable de la respuesta que cuenta bytes y anota la petición al cerrarse"""
+
+    def __init__(self, cuerpo, al_cerrar):
+        self._cuerpo = cuerpo
+        self._al_cerrar = al_cerrar
+        self.bytes = 0
+
+    def __iter__(self):
+        for trozo in self._cuerpo:
+            self.bytes += len(trozo)
+            yield trozo
+
+    def close(self):
+        try:
+            if hasattr(self._cuerpo, 'close'):
+                self._cuerpo.close()
+        finally:
+            self._al_cerrar(self.bytes)
+
+
+class MedirPeticiones:
+    """Middleware WSGI: latencia, tamaño, consultas y tiempo de BD por endpoint.
+
+    La latencia va hasta que se envía el último byte, así que incluye las
+    respuestas en streaming. La aplicación rellena `endpoint`, `consultas` y
+    `db` en environ[CLAVE_PETICION].
+    """
+
+    def __init__(self, app, metricas):
+        self.app = app
+        self.metricas = metricas
+        metricas.definir('peticiones_total', 'counter', 'Peticiones atendidas por endpoint, método y estado')
+        metricas.definir('peticion_segundos', 'histogram', 'Duración de la petición hasta el último byte',
+                         BUCKETS_SEGUNDOS)
+        metricas.definir('respuesta_bytes', 'histogram', 'Tamaño del cuerpo de la respuesta', BUCKETS_BYTES)
+        metricas.definir('consultas_por_peticion', 'histogram', 'Consultas a PostgreSQL por petición',
+                         BUCKETS_CONSULTAS)
+        metricas.definir('db_segundos_por_peticion', 'histogram', 'Tiempo en PostgreSQL por petición',
+                         BUCKETS_SEGUNDOS)
+
+    def __call__(self, environ, start_response):
+        inicio = time.perf_counter()
+        datos = environ[CLAVE_PETICION] = {'endpoint': None, 'consultas': 0, 'db': 0.0, 'estado': '500'}
+
+        def start(status, headers, exc_info=None):
+            datos['estado'] = status.split(' ', 1)[0]
+            return start_response(status, headers, exc_info)
+
+        def al_cerrar(tam):
+            endpoint = datos['endpoint'] or 'sin_ruta'
+            m = self.metricas
+            m.contar('peticiones_total', endpoint=endpoint, metodo=environ.get('REQUEST_METHOD', ''),
+                     estado=datos['estado'])
+            m.observar('peticion_segundos', time.perf_counter() - inicio, endpoint=endpoint)
+            m.observar('respuesta_bytes', tam, endpoint=endpoint)
+            m.observar('consultas_por_peticion', datos['consultas'], endpoint=endpoint)
+            m.observar('db_segundos_por_peticion', datos['db'], endpoint=endpoint)
+
+        try:
+            cuerpo = self.app(environ, start)
+        except Exception:
+            al_cerrar(0)
+            raise
+        return _CuerpoMedido(cuerpo, al_cerrar)
@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+"""
+MIGRACIONES DEL ESQUEMA
+
+Uso (desde sistema_vuelos/):
+    python migraciones.py            aplica las migraciones pendientes
+    python migraciones.py --estado   muestra las aplicadas y las pendientes
+
+Cada migración se aplica una sola vez y queda anotada en la tabla
+`esquema_migraciones`. Si el esquema ya está al día solo se hace una consulta.
+"""
+
+import sys
+import time
+
+import bcrypt
+import psycopg2
+import psycopg2.errors
+
+from asientos import crear_asientos, recontar_disponibles
+
+# Clave del pg_advisory_lock que serializa varios despliegues a la vez
+CLAVE_BLOQUEO = 7314201
+
+SQL_TABLA_VERSIONES = '''
+    CREATE TABLE IF NOT EXISTS esquema_migraciones (
+        version INTEGER PRIMARY KEY,
+        descripcion VARCHAR(200) NOT NULL,
+        aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duracion_ms INTEGER
+    )
+'''
+
+
+class Indice:
+    """Índice creado con CREATE INDEX CONCURRENTLY (sin bloquear escrituras).
+
+    Si un intento anterior falló a medias queda un índice INVALID con el mismo
+    nombre; se borra antes de volver a crearlo.
+    """
+
+    def __init__(self, nombre, tabla, definicion, unico=False):
+        self.nombre = nombre
+        self.tabla = tabla
+        self.definicion = definicion
+        self.unico = unico
+
+    def aplicar(self, cur):
+        cur.execute('''
+            SELECT i.indisvalid FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+        ''', (self.nombre,))
+        fila = cur.fetchone()
+        if fila is not None and fila[0]:
+            return
+        if fila is not None:
+            cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {self.nombre}')
+        unico = 'UNIQUE ' if self.unico else ''
+        cur.execute(f'CREATE {unico}INDEX CONCURRENTLY IF NOT EXISTS {self.nombre} '
+                    f'ON {self.tabla} {self.definicion}')
+
+
+class Migracion:
+    """Paso del esquema: una lista de sentencias SQL, Indice o funciones(cur).
+
+    Con `transaccion=True` todo el paso se aplica o se deshace junto con su
+    anotación en la tabla de versiones. Los pasos con índices CONCURRENTLY no
+    pueden ir en transacción; sus sentencias deben poder repetirse.
+    """
+
+    def __init__(self, version, descripcion, pasos, transaccion=True):
+        self.version = version
+        self.descripcion = descripcion
+        self.pasos = pasos
+        self.transaccion = transaccion
+
+
+def _datos_iniciales(cur):
+    """Usuario admin y aerolíneas de demostración (no pisa datos existentes)"""
+    admin_password = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    cur.execute('''
+        INSERT INTO usuarios (username, password_hash, nombre, rol)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (username) DO NOTHING
+    ''', ('admin', admin_password, 'Administrador', 'admin'))
+    aerolineas_demo = [
+        ('AA', 'American Airlines', 'USA'),
+        ('LA', 'LATAM Airlines', 'Chile'),
+        ('IB', 'Iberia', 'Spain'),
+        ('AF', 'Air France', 'France'),
+        ('LH', 'Lufthansa', 'Germany')
+    ]
+    for codigo, nombre, pais in aerolineas_demo:
+        cur.execute('''
+            INSERT INTO aerolineas (codigo, nombre, pais_origen, activa)
+            VALUES (%s, %s, %s, TRUE)
+            ON CONFLICT (codigo) DO NOTHING
+        ''', (codigo, nombre, pais))
+
+
+def _inventario_asientos(cur):
+    """Asientos de los vuelos existentes y ocupación según sus reservas confirmadas.
+
+    Cada reserva se queda con el asiento que tenía anotado si existe y está
+    libre; si no, con el primero libre de su clase o, en último caso, de
+    cualquier clase.
+    """
+    cur.execute('SELECT id, capacidad FROM vuelos')
+    vuelos = cur.fetchall()
+    for vuelo_id, capacidad in vuelos:
+        crear_asientos(cur, vuelo_id, capacidad)
+    cur.execute('''
+        UPDATE asientos s SET reserva_id = r.id
+        FROM (
+            SELECT DISTINCT ON (vuelo_id, upper(trim(asiento))) id, vuelo_id, upper(trim(asiento)) AS asiento
+            FROM reservas
+            WHERE estado = 'confirmada' AND asiento IS NOT NULL
+            ORDER BY vuelo_id, upper(trim(asiento)), id
+        ) r
+        WHERE s.vuelo_id = r.vuelo_id AND s.asiento = r.asiento
+    ''')
+    cur.execute('''
+        SELECT r.id, r.vuelo_id, r.clase FROM reservas r
+        WHERE r.estado = 'confirmada'
+          AND NOT EXISTS (SELECT 1 FROM asientos s WHERE s.reserva_id = r.id)
+        ORDER BY r.id
+    ''')
+    for reserva_id, vuelo_id, clase in cur.fetchall():
+        cur.execute('''
+            UPDATE asientos SET reserva_id = %s
+            WHERE (vuelo_id, asiento) = (
+                SELECT vuelo_id, asiento FROM asientos
+                WHERE vuelo_id = %s AND reserva_id IS NULL
+                ORDER BY clase = %s DESC, fila, asiento
+                LIMIT 1
+            )
+            RETURNING asiento
+        ''', (reserva_id, vuelo_id, clase))
+        asignado = cur.fetchone()
+        if asignado:
+            cur.execute('UPDATE reservas SET asiento = %s WHERE id = %s', (asignado[0], reserva_id))
+    recontar_disponibles(cur, [vuelo_id for vuelo_id, _ in vuelos])
+
+
+def _sin_vuelos_repetidos(cur):
+    """Aborta si hay vuelos con el mismo número y salida, listando sus ids.
+
+    Con ellos el índice único no se puede crear: quedaría INVALID y cada
+    arranque lo volvería a intentar. Cuál sobra lo decide una persona.
+    """
+    cur.execute('''
+        SELECT numero_vuelo, fecha_salida, array_agg(id ORDER BY id)
+        FROM vuelos
+        GROUP BY numero_vuelo, fecha_salida
+        HAVING count(*) > 1
+        ORDER BY numero_vuelo, fecha_salida
+    ''')
+    repetidos = cur.fetchall()
+    if repetidos:
+        lista = '\n'.join(f'  {numero} {salida:%Y-%m-%d %H:%M}: ids {", ".join(map(str, ids))}'
+                          for numero, salida, ids in repetidos)
+        raise RuntimeError(f'{len(repetidos)} pares (numero_vuelo, fecha_salida) repetidos en vuelos; '
+                           f'cambie o elimine los sobrantes y vuelva a migrar:\n{lista}')
+
+
+# ==================== MIGRACIONES ====================
+# Nunca se edita una migración ya desplegada: los cambios van en una nueva
+# con el siguiente número de versión.
+
+MIGRACIONES = [
+    Migracion(1, 'Esquema inicial', [
+        '''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            email VARCHAR(100),
+            rol VARCHAR(20) NOT NULL DEFAULT 'empleado',
+            activo BOOLEAN DEFAULT TRUE,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS aerolineas (
+            id SERIAL PRIMARY KEY,
+            codigo VARCHAR(3) UNIQUE NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            pais_origen VARCHAR(100),
+            fecha_fundacion DATE,
+            activa BOOLEAN DEFAULT TRUE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS vuelos (
+            id SERIAL PRIMARY KEY,
+            numero_vuelo VARCHAR(10) NOT NULL,
+            aerolinea_id INTEGER REFERENCES aerolineas(id),
+            origen VARCHAR(100) NOT NULL,
+            destino VARCHAR(100) NOT NULL,
+            fecha_salida TIMESTAMP NOT NULL,
+            fecha_llegada TIMESTAMP NOT NULL,
+            capacidad INTEGER NOT NULL,
+            asientos_disponibles INTEGER NOT NULL,
+            estado VARCHAR(20) DEFAULT 'programado',
+            CONSTRAINT chk_capacidad CHECK (asientos_disponibles <= capacidad)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pasajeros (
+            id SERIAL PRIMARY KEY,
+            pasaporte VARCHAR(50) UNIQUE NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            apellido VARCHAR(100) NOT NULL,
+            nacionalidad VARCHAR(100),
+            fecha_nacimiento DATE,
+            telefono VARCHAR(20),
+            email VARCHAR(100)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS reservas (
+            id SERIAL PRIMARY KEY,
+            codigo_reserva VARCHAR(20) UNIQUE NOT NULL,
+            vuelo_id INTEGER REFERENCES vuelos(id),
+            pasajero_id INTEGER REFERENCES pasajeros(id),
+            asiento VARCHAR(10),
+            clase VARCHAR(20) DEFAULT 'economica',
+            precio DECIMAL(10,2),
+            estado VARCHAR(20) DEFAULT 'confirmada',
+            fecha_reserva TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS logs_auditoria (
+            id SERIAL PRIMARY KEY,
+            usuario_id INTEGER REFERENCES usuarios(id),
+            accion VARCHAR(50) NOT NULL,
+            tabla_afectada VARCHAR(50),
+            registro_id INTEGER,
+            detalles JSONB,
+            ip_address VARCHAR(45),
+            fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+
+    Migracion(2, 'Datos iniciales: admin y aerolíneas demo', [_datos_iniciales]),
+
+    # Listado paginado de vuelos: orden (fecha_salida, id) y filtros por
+    # aerolínea, ruta y estado; también el rango por día del dashboard
+    Migracion(3, 'Índices de vuelos', [
+        Indice('idx_vuelos_salida', 'vuelos', '(fecha_salida, id)'),
+        Indice('idx_vuelos_aerolinea_salida', 'vuelos', '(aerolinea_id, fecha_salida, id)'),
+        Indice('idx_vuelos_ruta_salida', 'vuelos', '(origen, destino, fecha_salida, id)'),
+        Indice('idx_vuelos_estado_salida', 'vuelos', '(estado, fecha_salida, id)'),
+    ], transaccion=False),
+
+    # Joins de reservas con vuelos/pasajeros, pasajeros de un vuelo y
+    # listado de reservas por fecha
+    Migracion(4, 'Índices de reservas', [
+        Indice('idx_reservas_vuelo', 'reservas', '(vuelo_id)'),
+        Indice('idx_reservas_pasajero', 'reservas', '(pasajero_id)'),
+        Indice('idx_reservas_fecha', 'reservas', '(fecha_reserva)'),
+    ], transaccion=False),
+
+    Migracion(5, 'Índices de logs de auditoría', [
+        Indice('idx_logs_fecha', 'logs_auditoria', '(fecha_hora)'),
+        Indice('idx_logs_usuario', 'logs_auditoria', '(usuario_id)'),
+    ], transaccion=False),
+
+    Migracion(6, 'Extensión pg_trgm', ['CREATE EXTENSION IF NOT EXISTS pg_trgm']),
+
+    # Directorio de pasajeros: orden alfabético, prefijo de apellido y
+    # búsqueda aproximada por trigramas
+    Migracion(7, 'Índices de pasajeros', [
+        Indice('idx_pasajeros_apellido_nombre', 'pasajeros', '(apellido, nombre, id)'),
+        Indice('idx_pasajeros_apellido_prefijo', 'pasajeros', '(lower(apellido) text_pattern_ops)'),
+        Indice('idx_pasajeros_nombre_trgm', 'pasajeros', "USING gin ((nombre || ' ' || apellido) gin_trgm_ops)"),
+    ], transaccion=False),
+
+    # Un registro por asiento: las reservas toman asientos con
+    # FOR UPDATE SKIP LOCKED en vez de hacer cola sobre la fila del vuelo.
+    # La tabla es nueva, así que sus índices no necesitan CONCURRENTLY.
+    Migracion(8, 'Inventario de asientos', [
+        '''
+        CREATE TABLE asientos (
+            vuelo_id INTEGER NOT NULL REFERENCES vuelos(id) ON DELETE CASCADE,
+            asiento VARCHAR(10) NOT NULL,
+            clase VARCHAR(20) NOT NULL,
+            fila SMALLINT NOT NULL,
+            reserva_id INTEGER REFERENCES reservas(id) ON DELETE SET NULL,
+            PRIMARY KEY (vuelo_id, asiento)
+        )
+        ''',
+        'CREATE INDEX idx_asientos_libres ON asientos (vuelo_id, clase, fila, asiento) WHERE reserva_id IS NULL',
+        'CREATE UNIQUE INDEX idx_asientos_reserva ON asientos (reserva_id) WHERE reserva_id IS NOT NULL',
+        _inventario_asientos,
+    ]),
+
+    # Clave natural de un vuelo programado: la importación de temporada hace
+    # upsert sobre ella y así reimportar no duplica vuelos
+    Migracion(9, 'Índice único de vuelos por número y salida', [
+        _sin_vuelos_repetidos,
+        Indice('idx_vuelos_numero_salida', 'vuelos', '(numero_vuelo, fecha_salida)', unico=True),
+    ], transaccion=False),
+
+    # Contador de cambios por tabla: un trigger por sentencia lo incrementa,
+    # así la API puede responder 304 leyendo una fila sin tocar la tabla
+    Migracion(10, 'Contadores de cambios de vuelos y aerolíneas', [
+        '''
+        CREATE TABLE versiones_tablas (
+            tabla VARCHAR(63) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 1,
+            modificado TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "INSERT INTO versiones_tablas (tabla) VALUES ('vuelos'), ('aerolineas')",
+        '''
+        CREATE FUNCTION registrar_cambio_tabla() RETURNS trigger AS $$
+        BEGIN
+            UPDATE versiones_tablas SET version = version + 1, modificado = clock_timestamp()
+            WHERE tabla = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        '''
+        CREATE TRIGGER trg_vuelos_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vuelos
+        FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_tabla()
+        ''',
+        '''
+        CREATE TRIGGER trg_aerolineas_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON aerolineas
+        FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_tabla()
+        ''',
+    ]),
+
+    # Búsqueda incremental de pasajeros en el formulario de reservas por
+    # prefijo de pasaporte (el de apellido ya lo cubre la migración 7)
+    Migracion(11, 'Índice de prefijo de pasaporte', [
+        Indice('idx_pasajeros_pasaporte_prefijo', 'pasajeros', '(upper(pasaporte) text_pattern_ops)'),
+    ], transaccion=False),
+
+    # Hora del último cambio de cada vuelo: la lista de vuelos reservables en
+    # memoria lee solo los modificados desde su última lectura. La columna sin
+    # valor por defecto no reescribe la tabla; las filas antiguas quedan a NULL.
+    Migracion(12, 'Hora de modificación de vuelos', [
+        'ALTER TABLE vuelos ADD COLUMN IF NOT EXISTS modificado_en TIMESTAMPTZ',
+        '''
+        CREATE OR REPLACE FUNCTION marcar_modificado_en() RETURNS trigger AS $$
+        BEGIN
+            NEW.modificado_en := clock_timestamp();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        'DROP TRIGGER IF EXISTS trg_vuelos_modificado_en ON vuelos',
+        '''
+        CREATE TRIGGER trg_vuelos_modificado_en BEFORE INSERT OR UPDATE ON vuelos
+        FOR EACH ROW EXECUTE FUNCTION marcar_modificado_en()
+        ''',
+        Indice('idx_vuelos_modificado_en', 'vuelos', '(modificado_en)'),
+    ], transaccion=False),
+
+    # Aviso a los workers (LISTEN datos_referencia) de que cambió una tabla de
+    # referencia que tienen en memoria; el NOTIFY sale al confirmar
+    Migracion(13, 'Aviso de cambios en aerolíneas', [
+        '''
+        CREATE FUNCTION notificar_datos_referencia() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('datos_referencia', TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        '''
+        CREATE TRIGGER trg_aerolineas_notificar AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON aerolineas
+        FOR EACH STATEMENT EXECUTE FUNCTION notificar_datos_referencia()
+        ''',
+    ]),
+
+    # Logs particionados por mes de fecha_hora: los filtros por fecha solo
+    # leen las particiones de esos meses y los meses viejos se pueden borrar
+    # con DROP TABLE. Las filas se copian dentro de la transacción. Los índices
+    # de una tabla particionada no admiten CONCURRENTLY; se crean después de
+    # copiar y los heredan las particiones nuevas.
+    Migracion(14, 'Logs de auditoría particionados por mes', [
+        'ALTER TABLE logs_auditoria RENAME TO logs_auditoria_antigua',
+        'ALTER TABLE logs_auditoria_antigua RENAME CONSTRAINT logs_auditoria_pkey TO logs_auditoria_antigua_pkey',
+        'ALTER SEQUENCE logs_auditoria_id_seq OWNED BY NONE',
+        'ALTER SEQUENCE logs_auditoria_id_seq AS BIGINT',
+        '''
+        CREATE TABLE logs_auditoria (
+            id BIGINT NOT NULL DEFAULT nextval('logs_auditoria_id_seq'),
+            usuario_id INTEGER REFERENCES usuarios(id),
+            accion VARCHAR(50) NOT NULL,
+            tabla_afectada VARCHAR(50),
+            registro_id INTEGER,
+            detalles JSONB,
+            ip_address VARCHAR(45),
+            fecha_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, fecha_hora)
+        ) PARTITION BY RANGE (fecha_hora)
+        ''',
+        'ALTER SEQUENCE logs_auditoria_id_seq OWNED BY logs_auditoria.id',
+        # Sin partición por defecto: una fila de un mes sin partición falla
+        # y quien escribe llama a esta función y repite
+        '''
+        CREATE FUNCTION crear_particiones_logs(desde DATE, hasta DATE) RETURNS INTEGER AS $$
+        DECLARE
+            mes DATE := date_trunc('month', desde)::date;
+            nombre TEXT;
+            creadas INTEGER := 0;
+        BEGIN
+            WHILE mes <= hasta LOOP
+                nombre := 'logs_auditoria_p' || to_char(mes, 'YYYYMM');
+                IF to_regclass(nombre) IS NULL THEN
+                    BEGIN
+                        EXECUTE format('CREATE TABLE %I PARTITION OF logs_auditoria FOR VALUES FROM (%L) TO (%L)',
+                                       nombre, mes, (mes + INTERVAL '1 month')::date);
+                        creadas := creadas + 1;
+                    EXCEPTION WHEN duplicate_table THEN
+                        -- otro worker la creó a la vez
+                        NULL;
+                    END;
+                END IF;
+                mes := (mes + INTERVAL '1 month')::date;
+            END LOOP;
+            RETURN creadas;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        '''
+        SELECT crear_particiones_logs(LEAST(MIN(fecha_hora)::date, CURRENT_DATE),
+                                      GREATEST(MAX(fecha_hora)::date, CURRENT_DATE + 90))
+        FROM logs_auditoria_antigua
+        ''',
+        '''
+        INSERT INTO logs_auditoria (id, usuario_id, accion, tabla_afectada, registro_id, detalles, ip_address,
+                                    fecha_hora)
+        SELECT id, usuario_id, accion, tabla_afectada, registro_id, detalles, ip_address,
+               COALESCE(fecha_hora, CURRENT_TIMESTAMP)
+        FROM logs_auditoria_antigua
+        ''',
+        'DROP TABLE logs_auditoria_antigua',
+        # Orden del visor (fecha_hora, id) con y sin filtros; detalles @> ... por GIN
+        'CREATE INDEX idx_logs_fecha_id ON logs_auditoria (fecha_hora, id)',
+        'CREATE INDEX idx_logs_usuario_fecha ON logs_auditoria (usuario_id, fecha_hora, id)',
+        'CREATE INDEX idx_logs_accion_fecha ON logs_auditoria (accion, fecha_hora, id)',
+        'CREATE INDEX idx_logs_registro_fecha ON logs_auditoria (tabla_afectada, registro_id, fecha_hora, id)',
+        'CREATE INDEX idx_logs_detalles ON logs_auditoria USING gin (detalles jsonb_path_ops)',
+    ]),
+
+    # Directorio de pasajeros por prefijo de apellido: filtro y orden salen
+    # del mismo índice. Con collation "C" sirve para LIKE 'x%' y para
+    # ORDER BY lower(apellido) COLLATE "C"; la de la migración 7
+    # (text_pattern_ops) solo encuentra las filas y había que ordenarlas todas.
+    Migracion(15, 'Índice de pasajeros por prefijo de apellido y orden', [
+        Indice('idx_pasajeros_apellido_orden', 'pasajeros', '(lower(apellido) COLLATE "C", apellido, nombre, id)'),
+    ], transaccion=False),
+]
+
+
+# ==================== EJECUCIÓN ====================
+
+def aplicadas(cur):
+    """Versiones ya aplicadas (vacío si la tabla de versiones aún no existe)"""
+    try:
+        cur.execute('SELECT version FROM esquema_migraciones')
+    except psycopg2.errors.UndefinedTable:
+        return set()
+    return {fila[0] for fila in cur.fetchall()}
+
+
+def pendientes(cur, migraciones=MIGRACIONES):
+    hechas = aplicadas(cur)
+    return [m for m in sorted(migraciones, key=lambda m: m.version) if m.version not in hechas]
+
+
+def _aplicar(conn, migracion):
+    cur = conn.cursor()
+    inicio = time.monotonic()
+    for paso in migracion.pasos:
+        if isinstance(paso, Indice):
+            paso.aplicar(cur)
+        elif callable(paso):
+            paso(cur)
+        else:
+            cur.execute(paso)
+    duracion = int((time.monotonic() - inicio) * 1000)
+    cur.execute('INSERT INTO esquema_migraciones (version, descripcion, duracion_ms) VALUES (%s, %s, %s)',
+                (migracion.version, migracion.descripcion, duracion))
+    cur.close()
+    return duracion
+
+
+def migrar(conn, migraciones=MIGRACIONES, lock_timeout='5s', salida=print):
+    """Aplica en orden las migraciones pendientes y devuelve cuántas se aplicaron.
+
+    La conexión se usa en autocommit; las migraciones transaccionales abren su
+    propio BEGIN/COMMIT. `lock_timeout` evita que un ALTER se quede esperando
+    detrás de una transacción larga y bloquee a su vez todo el tráfico.
+    """
+    conn.autocommit = True
+    cur = conn.cursor()
+    # Camino rápido: esquema al día con una sola consulta y sin bloqueo
+    if {m.version for m in migraciones} <= aplicadas(cur):
+        cur.close()
+        return 0
+
+    cur.execute('SELECT pg_advisory_lock(%s)', (CLAVE_BLOQUEO,))
+    try:
+        cur.execute(SQL_TABLA_VERSIONES)
+        cur.execute('SET lock_timeout = %s', (lock_timeout,))
+        # Otro proceso pudo aplicar parte mientras se esperaba el bloqueo
+        lista = pendientes(cur, migraciones)
+        for migracion in lista:
+            salida(f"→ {migracion.version:04d} {migracion.descripcion}")
+            if migracion.transaccion:
+                conn.autocommit = False
+                try:
+                    duracion = _aplicar(conn, migracion)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+            else:
+                duracion = _aplicar(conn, migracion)
+            salida(f"  ✅ {duracion} ms")
+        return len(lista)
+    finally:
+        cur.execute('RESET lock_timeout')
+        cur.execute('SELECT pg_advisory_unlock(%s)', (CLAVE_BLOQUEO,))
+        cur.close()
+
+
+def mostrar_estado(conn, migraciones=MIGRACIONES):
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT version, aplicada_en, duracion_ms FROM esquema_migraciones')
+        hechas = {v: (fecha, ms) for v, fecha, ms in cur.fetchall()}
+    except psycopg2.errors.UndefinedTable:
+        hechas = {}
+    cur.close()
+    for m in sorted(migraciones, key=lambda m: m.version):
+        if m.version in hechas:
+            fecha, ms = hechas[m.version]
+            print(f"✅ {m.version:04d} {m.descripcion} ({fecha:%Y-%m-%d %H:%M}, {ms} ms)")
+        else:
+            print(f"⏳ {m.version:04d} {m.descripcion}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    from conexiones import crear_conexion
+
+    try:
+        conn = crear_conexion()
+    except psycopg2.Error:
+        return 1
+    try:
+        if '--estado' in argv:
+            mostrar_estado(conn)
+            return 0
+        n = migrar(conn)
+        print(f"✅ {n} migraciones aplicadas" if n else "✅ Esquema al día")
+        return 0
+    except Exception as e:
+        print(f"❌ Error en migración: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
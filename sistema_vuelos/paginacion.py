@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+PAGINACIÓN POR CURSOR (KEYSET)
+"""
+
+import base64
+import json
+from urllib.parse import urlencode
+
+
+def codificar_cursor(*valores):
+    """Convierte los valores de la clave de orden de una fila en un token para la URL"""
+    datos = json.dumps(valores, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Devuelve la lista de valores del cursor, o None si falta o no es válido"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def tam_pagina(args, defecto=50, maximo=200):
+    """Tamaño de página pedido en `?por_pagina=`, acotado a [1, maximo]"""
+    try:
+        n = int(args.get('por_pagina', defecto))
+    except (TypeError, ValueError):
+        n = defecto
+    return max(1, min(n, maximo))
+
+
+def url_pagina(ruta, filtros, **extra):
+    """URL de otra página conservando los filtros no vacíos"""
+    params = {k: v for k, v in filtros.items() if v not in (None, '')}
+    params.update({k: v for k, v in extra.items() if v not in (None, '')})
+    return f'{ruta}?{urlencode(params)}' if params else ruta
+
+
+def recortar_pagina(filas, limite, antes=None, despues=None):
+    """Recorta las `limite + 1` filas leídas y dice si hay página anterior/siguiente.
+
+    Con `antes` la consulta se hizo en orden inverso, así que se da la vuelta.
+    """
+    hay_mas = len(filas) > limite
+    filas = list(filas[:limite])
+    if antes:
+        filas.reverse()
+        return filas, hay_mas, True
+    return filas, bool(despues), hay_mas
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+PERFILADO DE CONSULTAS LENTAS
+"""
+
+import atexit
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Se aplican en orden: primero los literales de texto, para que sus números
+# o comentarios no se toquen
+_NORMALIZAR = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'--[^\n]*'), ''),
+    (re.compile(r'%\(\w+\)s|%s'), '?'),
+    (re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\s+'), ' '),
+    # IN (?, ?, ?) y filas de VALUES, que cambian de tamaño en cada llamada
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?, ...)'),
+    (re.compile(r'\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+'), '(?, ...), ...'),
+]
+
+_LECTURA = re.compile(r'\(?\s*(?:select|with)\b', re.I)
+_NO_EXPLICABLE = re.compile(r'\bfor (?:update|no key update|share|key share)\b|\bnextval\b|\bpg_notify\b', re.I)
+
+MAX_LARGO = 4000
+
+
+def normalizar(sql):
+    """Texto de la consulta sin valores concretos: agrupa las llamadas con distintos parámetros"""
+    for patron, reemplazo in _NORMALIZAR:
+        sql = patron.sub(reemplazo, sql)
+    return sql.strip()[:MAX_LARGO]
+
+
+def _texto(sql, cur):
+    if isinstance(sql, bytes):
+        return sql.decode('utf-8', 'replace')
+    if isinstance(sql, str):
+        return sql
+    try:
+        # psycopg2.sql.Composed
+        return sql.as_string(cur)
+    except Exception:
+        return str(sql)
+
+
+def explicable(consulta):
+    """Solo lecturas: EXPLAIN ANALYZE ejecuta la consulta de verdad"""
+    return bool(_LECTURA.match(consulta)) and not _NO_EXPLICABLE.search(consulta)
+
+
+class _Consulta:
+    __slots__ = ('llamadas', 'total', 'maximo', 'lentas', 'muestras', 'plan', 'plan_momento', 'explicada')
+
+    def __init__(self, muestras):
+        self.llamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.lentas = 0
+        self.muestras = deque(maxlen=muestras)
+        self.plan = None
+        self.plan_momento = None
+        self.explicada = None
+
+    def percentil(self, ordenadas, q):
+        if not ordenadas:
+            return 0.0
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+class PerfiladorConsultas:
+    """Tiempos de cada consulta, agrupados por su texto normalizado.
+
+    Por consulta guarda llamadas, tiempo total y máximo y las últimas
+    `muestras` duraciones (de ahí salen p50/p95/p99). Como mucho
+    `max_consultas` consultas distintas: al llenarse se olvida la que menos
+    tiempo total lleva. Las ejecuciones por encima de `umbral` segundos van
+    además a un buffer circular de `lentas` entradas.
+
+    Con `explain`, la primera vez que una lectura pasa del umbral (y luego
+    como mucho cada `explain_intervalo` segundos) un hilo la repite con
+    EXPLAIN (ANALYZE, BUFFERS) en una transacción de solo lectura que se
+    deshace, con una conexión propia del pool. Todo es por worker.
+    """
+
+    def __init__(self, pool, umbral=0.1, max_consultas=500, muestras=512, lentas=100,
+                 explain=False, explain_intervalo=600.0, explain_timeout=5.0):
+        self._pool = pool
+        self.umbral = umbral
+        self.max_consultas = max_consultas
+        self.muestras = muestras
+        self.max_lentas = lentas
+        self.explain = explain
+        self.explain_intervalo = explain_intervalo
+        self.explain_timeout = explain_timeout
+        self._iniciar_estado()
+        atexit.register(self.detener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        self._lock = threading.Lock()
+        self._consultas = {}
+        self._lentas = deque(maxlen=self.max_lentas)
+        self._cola = queue.Queue(maxsize=20)
+        self._hilo = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._desde = datetime.now()
+        self._stats = {'ejecuciones': 0, 'lentas': 0, 'olvidadas': 0, 'planes': 0, 'planes_descartados': 0}
+
+    def registrar(self, cur, sql, params, segundos, origen=None):
+        """Anota una ejecución; `cur` es el cursor de psycopg2 que la ejecutó"""
+        consulta = normalizar(_texto(sql, cur))
+        with self._lock:
+            self._stats['ejecuciones'] += 1
+            entrada = self._consultas.get(consulta)
+            if entrada is None:
+                if len(self._consultas) >= self.max_consultas:
+                    del self._consultas[min(self._consultas, key=lambda c: self._consultas[c].total)]
+                    self._stats['olvidadas'] += 1
+                entrada = self._consultas[consulta] = _Consulta(self.muestras)
+            entrada.llamadas += 1
+            entrada.total += segundos
+            entrada.maximo = max(entrada.maximo, segundos)
+            entrada.muestras.append(segundos)
+            if segundos < self.umbral:
+                return
+            entrada.lentas += 1
+            self._stats['lentas'] += 1
+            self._lentas.append({'momento': datetime.now(), 'segundos': segundos,
+                                 'consulta': consulta, 'origen': origen})
+            ahora = time.monotonic()
+            explicar = (self.explain and explicable(consulta)
+                        and (entrada.explicada is None or ahora - entrada.explicada >= self.explain_intervalo))
+            if explicar:
+                entrada.explicada = ahora
+        if explicar:
+            try:
+                texto = cur.mogrify(sql, params)
+            except Exception:
+                return
+            self._asegurar_hilo()
+            try:
+                self._cola.put_nowait((consulta, texto))
+            except queue.Full:
+                with self._lock:
+                    self._stats['planes_descartados'] += 1
+
+    # ---------- EXPLAIN en segundo plano ----------
+
+    def _asegurar_hilo(self):
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._bucle, name='perfilador', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            try:
+                consulta, texto = self._cola.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            plan = self._explicar(texto)
+            with self._lock:
+                entrada = self._consultas.get(consulta)
+                if entrada is not None:
+                    entrada.plan = plan
+                    entrada.plan_momento = datetime.now()
+                    self._stats['planes'] += 1
+
+    def _explicar(self, texto):
+        conn = None
+        try:
+            conn = self._pool.obtener()
+            cur = conn.cursor()
+            # Primera sentencia de la transacción: nada de lo que haga el
+            # EXPLAIN ANALYZE puede escribir, y se deshace igualmente
+            cur.execute('SET TRANSACTION READ ONLY')
+            cur.execute("SELECT set_config('statement_timeout', %s, true)",
+                        (f'{int(self.explain_timeout * 1000)}ms',))
+            if isinstance(texto, str):
+                texto = texto.encode('utf-8')
+            cur.execute(b'EXPLAIN (ANALYZE, BUFFERS) ' + texto)
+            plan = '\n'.join(fila[0] for fila in cur.fetchall())
+            cur.close()
+            return plan
+        except Exception as e:
+            return f'No se pudo obtener el plan: {e}'
+        finally:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                self._pool.devolver(conn)
+
+    def detener(self, timeout=5.0):
+        self._parar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo.is_alive() and self._pid == os.getpid():
+            hilo.join(timeout)
+
+    # ---------- informe ----------
+
+    def reiniciar(self):
+        with self._lock:
+            self._consultas.clear()
+            self._lentas.clear()
+            self._desde = datetime.now()
+
+    def informe(self, orden='total', limite=50):
+        """Consultas ordenadas por `orden` (total, media, p95, maximo, llamadas) y las últimas lentas"""
+        with self._lock:
+            filas = []
+            for consulta, e in self._consultas.items():
+                ordenadas = sorted(e.muestras)
+                filas.append({
+                    'consulta': consulta,
+                    'llamadas': e.llamadas,
+                    'total': e.total,
+                    'media': e.total / e.llamadas,
+                    'maximo': e.maximo,
+                    'p50': e.percentil(ordenadas, 0.50),
+                    'p95': e.percentil(ordenadas, 0.95),
+                    'p99': e.percentil(ordenadas, 0.99),
+                    'lentas': e.lentas,
+                    'plan': e.plan,
+                    'plan_momento': e.plan_momento,
+                })
+            lentas = list(reversed(self._lentas))
+            desde = self._desde
+        if orden not in ('total', 'media', 'p95', 'maximo', 'llamadas'):
+            orden = 'total'
+        filas.sort(key=lambda f: f[orden], reverse=True)
+        return {'consultas': filas[:limite], 'distintas': len(filas), 'lentas': lentas, 'desde': desde}
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['consultas'] = len(self._consultas)
+        datos.update(umbral=self.umbral, explain=self.explain)
+        return datos
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+DATOS DE REFERENCIA EN MEMORIA (AEROLÍNEAS Y SIMILARES)
+"""
+
+import atexit
+import os
+import select
+import threading
+import time
+
+# Canal de NOTIFY; el trigger de cada tabla envía su nombre como payload
+CANAL = 'datos_referencia'
+
+
+class DatosReferencia:
+    """Tablas pequeñas que casi no cambian, cargadas enteras en memoria por worker.
+
+    Cada tabla se registra con su consulta. Un hilo escucha el canal
+    `datos_referencia` con una conexión propia; cuando un trigger avisa de
+    un cambio se sube la versión de esa tabla y la siguiente lectura la
+    recarga. Mientras el hilo no está escuchando (arranque, conexión caída)
+    los avisos se pueden perder, así que las tablas solo se dan por buenas
+    durante `ttl_sin_aviso` segundos.
+    """
+
+    def __init__(self, conectar, ttl_sin_aviso=5.0, reintento=5.0):
+        self._conectar = conectar
+        self.ttl_sin_aviso = ttl_sin_aviso
+        self.reintento = reintento
+        self._consultas = {}
+        self._stats = {'cargas': 0, 'aciertos': 0, 'avisos': 0, 'conexiones': 0}
+        self._iniciar_estado()
+        atexit.register(self.detener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._iniciar_estado)
+
+    def _iniciar_estado(self):
+        # La conexión de escucha del padre no sirve en el hijo
+        self._lock = threading.Lock()
+        self._datos = {}
+        self._versiones = {}
+        self._escuchando = False
+        self._hilo = None
+        self._pid = None
+        self._parar = threading.Event()
+
+    def registrar(self, tabla, sql):
+        """Añade una tabla; `sql` devuelve todas sus filas, con columna id, en el orden de listado"""
+        self._consultas[tabla] = sql
+
+    def invalidar(self, tabla=None):
+        """Marca como viejas una tabla (o todas); se recargan en la siguiente lectura"""
+        with self._lock:
+            for t in ([tabla] if tabla else list(self._consultas)):
+                self._versiones[t] = self._versiones.get(t, 0) + 1
+
+    def filas(self, conn, tabla):
+        """Lista de filas (dicts) en el orden de la consulta registrada"""
+        return self._obtener(conn, tabla)[2]
+
+    def por_id(self, conn, tabla):
+        """Diccionario id -> fila"""
+        return self._obtener(conn, tabla)[3]
+
+    def _obtener(self, conn, tabla):
+        self._asegurar_hilo()
+        with self._lock:
+            version = self._versiones.get(tabla, 0)
+            entrada = self._datos.get(tabla)
+            if (entrada is not None and entrada[0] == version
+                    and (self._escuchando or time.monotonic() - entrada[1] < self.ttl_sin_aviso)):
+                self._stats['aciertos'] += 1
+                return entrada
+        # Se guarda con la versión de antes de leer: si llega un aviso a mitad
+        # de la carga, la siguiente lectura vuelve a cargar
+        cur = conn.cursor()
+        try:
+            cur.execute(self._consultas[tabla])
+            nombres = [d[0] for d in cur.description]
+            filas = [dict(zip(nombres, fila)) for fila in cur.fetchall()]
+        finally:
+            cur.close()
+        entrada = (version, time.monotonic(), filas, {f['id']: f for f in filas})
+        with self._lock:
+            self._datos[tabla] = entrada
+            self._stats['cargas'] += 1
+        return entrada
+
+    def _asegurar_hilo(self):
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._bucle, name='datos-referencia', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            conn = None
+            try:
+                conn = self._conectar()
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f'LISTEN {CANAL}')
+                cur.close()
+                # Lo que cambió antes de empezar a escuchar no se ha avisado
+                self.invalidar()
+                self._escuchando = True
+                self._stats['conexiones'] += 1
+                while not self._parar.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            aviso = conn.notifies.pop(0)
+                            self._stats['avisos'] += 1
+                            self.invalidar(aviso.payload or None)
+            except Exception as e:
+                print(f"Error escuchando cambios de datos de referencia: {e}")
+            finally:
+                self._escuchando = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._parar.wait(self.reintento)
+
+    def detener(self, timeout=5.0):
+        self._parar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo.is_alive() and self._pid == os.getpid():
+            hilo.join(timeout)
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['escuchando'] = self._escuchando
+            datos['tablas'] = {t: len(e[2]) for t, e in self._datos.items()}
+        return datos
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+VUELOS RESERVABLES EN MEMORIA (SELECTOR DEL FORMULARIO DE RESERVAS)
+"""
+
+import threading
+import time
+from datetime import datetime
+
+COLUMNAS = ('id', 'numero_vuelo', 'origen', 'destino', 'fecha_salida', 'asientos_disponibles', 'estado')
+
+
+class VuelosReservables:
+    """Vuelos que se pueden reservar, agrupados por ruta, mantenidos en memoria.
+
+    Reservable es: sale dentro de los próximos `dias`, está programado y le
+    quedan asientos. Cada consulta mira el contador de cambios de `vuelos`
+    (una fila de versiones_tablas); si cambió, solo se leen los vuelos con
+    `modificado_en` posterior a la última lectura, por su índice. Cada
+    `recarga` segundos se rehace la lista entera para que entren los días
+    nuevos de la ventana y se vayan los vuelos borrados.
+    """
+
+    def __init__(self, dias=60, por_ruta=20, recarga=600.0, margen=5.0):
+        self.dias = dias
+        self.por_ruta = por_ruta
+        self.recarga = recarga
+        # Solape al leer cambios: cubre transacciones que confirman un poco
+        # después de la hora que marcó el trigger
+        self.margen = margen
+        self._lock = threading.Lock()
+        self._vuelos = {}
+        self._rutas = None
+        self._version = None
+        self._marca = None
+        self._hasta = None
+        self._cargado = 0.0
+        self._stats = {'recargas': 0, 'incrementales': 0, 'cambios': 0, 'sin_cambios': 0}
+
+    def _reservable(self, vuelo):
+        return (vuelo['estado'] == 'programado' and vuelo['asientos_disponibles'] > 0
+                and vuelo['fecha_salida'] < self._hasta)
+
+    def _recargar(self, cur, version):
+        cur.execute("SELECT clock_timestamp(), LOCALTIMESTAMP + make_interval(days => %s)", (self.dias,))
+        marca, hasta = cur.fetchone()
+        cur.execute(f'''
+            SELECT {', '.join(COLUMNAS)} FROM vuelos
+            WHERE fecha_salida > LOCALTIMESTAMP AND fecha_salida < %s
+              AND estado = 'programado' AND asientos_disponibles > 0
+        ''', (hasta,))
+        self._vuelos = {fila[0]: dict(zip(COLUMNAS, fila)) for fila in cur.fetchall()}
+        self._hasta = hasta
+        self._marca = marca
+        self._version = version
+        self._cargado = time.monotonic()
+        self._rutas = None
+        self._stats['recargas'] += 1
+
+    def _aplicar_cambios(self, cur, version):
+        cur.execute('SELECT clock_timestamp()')
+        marca = cur.fetchone()[0]
+        cur.execute(f'''
+            SELECT {', '.join(COLUMNAS)} FROM vuelos
+            WHERE modificado_en > %s::timestamptz - make_interval(secs => %s)
+        ''', (self._marca, self.margen))
+        filas = cur.fetchall()
+        for fila in filas:
+            vuelo = dict(zip(COLUMNAS, fila))
+            if self._reservable(vuelo):
+                self._vuelos[vuelo['id']] = vuelo
+            else:
+                self._vuelos.pop(vuelo['id'], None)
+        self._marca = marca
+        self._version = version
+        self._rutas = None
+        self._stats['incrementales'] += 1
+        self._stats['cambios'] += len(filas)
+
+    def _al_dia(self, cur):
+        cur.execute("SELECT version FROM versiones_tablas WHERE tabla = 'vuelos'")
+        fila = cur.fetchone()
+        version = fila[0] if fila else None
+        with self._lock:
+            if self._version is None or time.monotonic() - self._cargado >= self.recarga:
+                self._recargar(cur, version)
+            elif version != self._version:
+                self._aplicar_cambios(cur, version)
+            else:
+                self._stats['sin_cambios'] += 1
+            if self._rutas is None:
+                self._rutas = self._agrupar()
+            return self._rutas
+
+    def _agrupar(self):
+        rutas = {}
+        for vuelo in sorted(self._vuelos.values(), key=lambda v: (v['origen'], v['destino'], v['fecha_salida'])):
+            rutas.setdefault((vuelo['origen'], vuelo['destino']), []).append(vuelo)
+        return rutas
+
+    def rutas(self, cur):
+        """[((origen, destino), [vuelos])] con los próximos `por_ruta` vuelos de cada ruta"""
+        ahora = datetime.now()
+        resultado = []
+        for ruta, vuelos in self._al_dia(cur).items():
+            proximos = [v for v in vuelos if v['fecha_salida'] > ahora][:self.por_ruta]
+            if proximos:
+                resultado.append((ruta, proximos))
+        return resultado
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['vuelos'] = len(self._vuelos)
+            datos['rutas'] = len(self._rutas) if self._rutas is not None else None
+        return datos
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+PRUEBAS DE LA IMPORTACIÓN DE PROGRAMACIÓN DE TEMPORADA
+
+Uso (desde sistema_vuelos/):
+    python -m unittest discover tests
+
+No necesitan base de datos: prueban la lectura del CSV y la expansión de
+líneas en vuelos.
+"""
+
+import io
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from horarios import _Rechazo, _expandir, _lineas_csv  # noqa: E402
+
+CABECERA = 'aerolinea,numero_vuelo,origen,destino,dias,desde,hasta,salida,llegada,capacidad,llegada_dias\n'
+AEROLINEAS = {'IB': 1}
+
+
+def lineas_csv(texto):
+    return list(_lineas_csv(io.BytesIO(texto.encode('utf-8'))))
+
+
+def expandir(salida, llegada, llegada_dias=''):
+    fila = dict(zip(CABECERA.strip().split(','),
+                    ['IB', 'IB6402', 'MAD', 'MEX', '1234567', '2025-04-01', '2025-04-01',
+                     salida, llegada, '288', llegada_dias]))
+    return list(_expandir(2, fila, AEROLINEAS))
+
+
+class LineasCSV(unittest.TestCase):
+
+    def test_linea_cuenta_saltos_dentro_de_comillas(self):
+        lineas = lineas_csv(CABECERA +
+                            'IB,"IB\n6402",MAD,MEX,1,2025-04-01,2025-04-30,12:05,17:40,288,\n'
+                            '\n'
+                            'IB,IB6403,MAD,MEX,1,2025-04-01,2025-04-30,12:05,17:40,288,\n')
+        self.assertEqual([(n, f['numero_vuelo']) for n, f in lineas], [(2, 'IB\n6402'), (5, 'IB6403')])
+
+
+class Expandir(unittest.TestCase):
+
+    def test_llegada_anterior_a_la_salida_es_al_dia_siguiente(self):
+        vuelo, = expandir('23:30', '06:10')
+        self.assertEqual(vuelo[5:7], [datetime(2025, 4, 1, 23, 30), datetime(2025, 4, 2, 6, 10)])
+
+    def test_llegada_dias_negativo_se_rechaza(self):
+        with self.assertRaisesRegex(_Rechazo, 'llegada_dias no puede ser negativo'):
+            expandir('12:05', '17:40', '-3')
+
+    def test_llegada_dias_cero_con_llegada_antes_de_la_salida_se_rechaza(self):
+        with self.assertRaisesRegex(_Rechazo, 'la llegada no es posterior a la salida'):
+            expandir('23:30', '06:10', '0')
+        with self.assertRaisesRegex(_Rechazo, 'la llegada no es posterior a la salida'):
+            expandir('12:05', '12:05')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+PRUEBAS DE LA IMPORTACIÓN DE PASAJEROS
+
+Uso (desde sistema_vuelos/):
+    python -m unittest discover tests
+
+Las que necesitan PostgreSQL usan la misma conexión que la app (DB_HOST o
+DATABASE_URL) y se saltan si no hay base de datos. Solo importan archivos
+cuyas filas se rechazan, así que no dejan datos.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+from conexiones import crear_conexion  # noqa: E402
+from importacion import _cabecera_csv, _filas_csv, importar_pasajeros  # noqa: E402
+
+
+def _conectar():
+    try:
+        return crear_conexion()
+    except psycopg2.Error as e:
+        raise unittest.SkipTest(f'sin PostgreSQL: {e}')
+
+
+def filas_csv(texto):
+    flujo = io.BytesIO(texto.encode('utf-8'))
+    cabecera, delimitador = _cabecera_csv(flujo)
+    errores = []
+    return list(_filas_csv(flujo, cabecera, delimitador, errores)), errores
+
+
+class FilasCSV(unittest.TestCase):
+
+    def test_columnas_de_mas_o_de_menos_van_a_rechazos(self):
+        filas, errores = filas_csv('pasaporte;nombre;apellido\n'
+                                   'A1;Ana;Paz\n'
+                                   'A2;Luis\n'
+                                   'A3;Eva;Sol;extra\n')
+        self.assertEqual(errores, [])
+        self.assertEqual([(f[0], f[1], f[-1]) for f in filas], [
+            (2, 'A1', ''),
+            (3, 'A2', 'tiene 2 columnas y la cabecera 3'),
+            (4, 'A3', 'tiene 4 columnas y la cabecera 3'),
+        ])
+
+    def test_linea_cuenta_saltos_dentro_de_comillas_y_columnas_desconocidas(self):
+        filas, _ = filas_csv('nombre,otra,apellido,pasaporte\n'
+                             '"Eva\nMaria",x,Sol,A1\n'
+                             '\n'
+                             'Ana,y,Paz,A2\n')
+        self.assertEqual([f[:4] for f in filas], [[2, 'A1', 'Eva\nMaria', 'Sol'], [5, 'A2', 'Ana', 'Paz']])
+
+
+class ImportarPasajerosBD(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = _conectar()
+        self.addCleanup(self.conn.close)
+
+    def importar(self, texto, formato='csv'):
+        return importar_pasajeros(self.conn, io.BytesIO(texto.encode('utf-8')), formato)
+
+    def test_fecha_con_anio_cero_se_rechaza_sin_abortar(self):
+        r = self.importar('pasaporte,nombre,apellido,fecha_nacimiento\n'
+                          'PRUEBA-0000,Ana,Prueba,0000-01-01\n')
+        self.assertEqual(r['leidas'], 1)
+        self.assertEqual(r['rechazadas'], 1)
+        self.assertEqual(r['rechazos'], [(2, 'PRUEBA-0000', 'fecha_nacimiento no es AAAA-MM-DD')])
+
+    def test_fila_con_columnas_de_menos_no_rechaza_el_archivo(self):
+        r = self.importar('pasaporte,nombre,apellido\n'
+                          'PRUEBA-COL1,Ana\n'
+                          'PRUEBA-COL2,Luis,Paz,sobra\n')
+        self.assertEqual(r['rechazadas'], 2)
+        self.assertEqual([motivo for _, _, motivo in r['rechazos']],
+                         ['tiene 2 columnas y la cabecera 3', 'tiene 4 columnas y la cabecera 3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
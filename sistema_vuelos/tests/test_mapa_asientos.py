@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+PRUEBAS DEL MAPA DE ASIENTOS EN MEMORIA
+
+Uso (desde sistema_vuelos/):
+    python -m unittest discover tests
+
+No necesitan base de datos. Con capacidad 120 hay 20 filas: la 1 es de
+primera, de la 2 a la 4 de ejecutiva y de la 5 en adelante de económica.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asientos import SinAsientos  # noqa: E402
+from mapa_asientos import MapaAsientos, MapasAsientos  # noqa: E402
+
+PRIMERA = ['1A', '1B', '1C', '1D', '1E', '1F']
+
+
+class CursorFalso:
+    """Cursor que responde a las consultas de MapasAsientos.asignar.
+
+    `tomar(elegidos)` decide qué asientos propuestos devuelve el
+    FOR UPDATE SKIP LOCKED, como si el resto los tuviera otra transacción.
+    """
+
+    def __init__(self, capacidad, tomar):
+        self.capacidad = capacidad
+        self.tomar = tomar
+        self.propuestas = []
+        self.sentencias = []
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.sentencias.append(sql)
+        if sql.startswith('SELECT capacidad'):
+            self._filas = [(self.capacidad,)]
+        elif 'FOR UPDATE SKIP LOCKED' in sql:
+            self.propuestas.append(params[1])
+            self._filas = [(a,) for a in self.tomar(params[1])]
+        else:
+            self._filas = []
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return list(self._filas)
+
+
+class Asignar(unittest.TestCase):
+
+    def test_ventanilla_antes_que_pasillo_y_centro(self):
+        mapa = MapaAsientos(120)
+        self.assertEqual([mapa.asignar('primera') for _ in range(6)], ['1A', '1F', '1C', '1D', '1B', '1E'])
+        self.assertEqual(mapa.asignar('economica'), '5A')
+
+    def test_clase_llena_devuelve_none_sin_tocar_el_mapa(self):
+        mapa = MapaAsientos(120, PRIMERA[:5])
+        self.assertEqual(mapa.asignar_grupo('primera', 2), None)
+        self.assertEqual(mapa.asignar('primera'), '1F')
+        ocupados = mapa.ocupados
+        self.assertEqual(mapa.asignar('primera'), None)
+        self.assertEqual(mapa.asignar_grupo('primera', 2), None)
+        self.assertEqual(mapa.asignar('turista'), None)
+        self.assertEqual(mapa.ocupados, ocupados)
+        self.assertEqual(mapa.libres('primera'), 0)
+
+
+class AsignarGrupo(unittest.TestCase):
+
+    def test_grupo_no_cruza_el_final_de_la_fila(self):
+        # 5F y 6A son bits contiguos pero no asientos contiguos
+        mapa = MapaAsientos(120, ['5A', '5B', '5C', '5D', '5E'])
+        self.assertEqual(mapa.asignar_grupo('economica', 2), ['6A', '6B'])
+        self.assertEqual(mapa.asignar('economica'), '5F')
+
+    def test_grupo_prefiere_no_cruzar_el_pasillo(self):
+        mapa = MapaAsientos(120, ['5A'])
+        self.assertEqual(mapa.asignar_grupo('economica', 3), ['5D', '5E', '5F'])
+
+    def test_grupo_mayor_que_un_bloque_ocupa_la_fila(self):
+        mapa = MapaAsientos(120, ['5A'])
+        self.assertEqual(mapa.asignar_grupo('economica', 4), ['5B', '5C', '5D', '5E'])
+
+    def test_sin_hueco_contiguo_toma_los_primeros_libres(self):
+        mapa = MapaAsientos(120, ['1B', '1E'])
+        self.assertEqual(mapa.asignar_grupo('primera', 3), ['1A', '1C', '1D'])
+        self.assertEqual(mapa.libres('primera'), 1)
+
+    def test_ultima_fila_incompleta(self):
+        # Capacidad 124: la fila 21 solo tiene de la A a la D
+        mapa = MapaAsientos(124, [f'{f}{l}' for f in range(1, 21) for l in 'ABCDEF'] + ['21A'])
+        self.assertEqual(mapa.asignar_grupo(None, 3), ['21B', '21C', '21D'])
+        self.assertEqual(mapa.libres(), 0)
+        self.assertEqual(mapa.asignar_grupo(None, 2), None)
+
+
+class MapasAsignar(unittest.TestCase):
+
+    def test_toma_parcial_libera_solo_los_tomados_y_reintenta(self):
+        # 5B lo tiene otra transacción: el primer intento solo consigue 5A
+        cur = CursorFalso(120, lambda elegidos: [a for a in elegidos if a != '5B'])
+        mapas = MapasAsientos()
+        self.assertEqual(mapas.asignar(cur, 1, 'economica', 2), ['5D', '5E'])
+        self.assertEqual(cur.propuestas, [['5A', '5B'], ['5D', '5E']])
+        self.assertIn('ROLLBACK TO SAVEPOINT asignar_asientos', cur.sentencias)
+        mapa = mapas.obtener(cur, 1)
+        # 5A vuelve a estar libre en el mapa; 5B sigue marcado
+        self.assertEqual(mapa.asignar('economica'), '5A')
+        self.assertEqual(mapa.asignar_grupo('economica', 1), ['5F'])
+        self.assertEqual(mapa.asignar_grupo('economica', 2), ['6A', '6B'])
+
+    def test_sin_poder_tomar_nada_agota_los_intentos(self):
+        cur = CursorFalso(120, lambda elegidos: [])
+        mapas = MapasAsientos(intentos=3)
+        with self.assertRaises(SinAsientos):
+            mapas.asignar(cur, 1, 'primera', 1)
+        self.assertEqual(len(cur.propuestas), 3)
+        # El último intento relee el mapa de la base de datos
+        self.assertEqual(sum(s.startswith('SELECT capacidad') for s in cur.sentencias), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()